@@ -24,6 +24,8 @@
         'security/ir.model.access.csv',
         'security/library_security.xml',
         'data/library_data.xml',
+        'data/library_cron.xml',
+        'data/library_mail_templates.xml',
 
         'wizards/quick_borrow_wizard_views.xml',
         'views/books_views.xml',
@@ -31,8 +33,13 @@
         'views/borrowing_views.xml',
         'views/borrowing_kanban_views.xml',
         'views/dashboard_views.xml',
+        'views/mass_operation_job_views.xml',
         
         'views/library_menus.xml',
+        'views/borrowing_history_views.xml',
+        'views/reservation_views.xml',
+        'views/perf_stat_views.xml',
+        'views/res_config_settings_views.xml',
         'views/templates.xml',
 
         
@@ -40,6 +47,7 @@
         'wizards/book_return_wizard_views.xml',
         'wizards/library_report_wizard_views.xml',
         'wizards/mass_operation_wizard_views.xml',
+        'wizards/book_import_wizard_views.xml',
 
         'reports/book_report.xml',
 
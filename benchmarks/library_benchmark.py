@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""Query-count and latency benchmarks for the Library_Manager module.
+
+Seeds a synthetic catalog (books, members, borrowings) into a local
+database that has the module installed, then measures the SQL query count
+and wall-clock time of the hot paths: book/member tree reads, the checkout
+and return wizards, the dashboard refresh and, when a running server is
+given, the public ``/library/books`` page.
+
+Everything runs in one transaction that is rolled back at the end, unless
+``--keep`` is given (then ``--no-seed`` reuses the data on later runs)::
+
+    python benchmarks/library_benchmark.py -c odoo.conf -d library_bench \\
+        --size 100k --output results.json --thresholds thresholds.json
+
+With ``--save-thresholds`` the measured values (plus some slack) are
+written to the thresholds file; later runs exit with status 1 when a
+scenario exceeds them.
+
+``--stress`` also runs concurrent checkouts from several threads, each
+checkout on its own cursor, against budgets too small for all of them. It
+reports checkouts/sec for one member (one shared budget) and for one
+member per thread, and exits with status 1 if a budget was overspent.
+These checkouts are committed, then removed at the end of the run.
+"""
+import argparse
+from datetime import date, timedelta
+import json
+import logging
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from psycopg2.extensions import TransactionRollbackError
+
+import odoo
+from odoo import api, SUPERUSER_ID
+from odoo.exceptions import UserError
+from odoo.tools import config, split_every
+
+_logger = logging.getLogger('library_benchmark')
+
+SIZES = {
+    '10k': 10000,
+    '100k': 100000,
+    '1m': 1000000,
+}
+BENCH_PREFIX = 'BENCH'
+CHECKOUT_BOOKS = 20
+STRESS_RETRIES = 10
+QUERY_SLACK = 1.1
+TIME_SLACK = 1.5
+
+
+class Measure:
+    """Count the queries and the time spent inside a ``with`` block"""
+
+    def __init__(self, cr):
+        self.cr = cr
+        self.queries = 0
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self._count = self.cr.sql_log_count
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
+        self.queries = self.cr.sql_log_count - self._count
+
+
+# ---------------------------------------------------------------------------
+# Seeding
+# ---------------------------------------------------------------------------
+
+def seed(env, size):
+    """Insert ``size`` books, size/10 members (with their budgets) and
+    2*size borrowings, in SQL except for the budgets"""
+    cr = env.cr
+    uid = env.uid
+    members = max(size // 10, 1)
+    _logger.info("Seeding %s books, %s members, %s borrowings", size, members, size * 2)
+
+    cr.execute("""
+        INSERT INTO library_book (name, author, isbn, borrow_price, status, language,
+                                  create_uid, write_uid, create_date, write_date)
+        SELECT %(prefix)s || ' Book ' || i,
+               'Author ' || (i %% 5000),
+               '978' || lpad(i::text, 10, '0'),
+               (i %% 20) + 1,
+               'available',
+               (ARRAY['ar', 'en', 'fr', 'es'])[1 + i %% 4],
+               %(uid)s, %(uid)s,
+               now() AT TIME ZONE 'UTC' - make_interval(mins => i),
+               now() AT TIME ZONE 'UTC' - make_interval(mins => i)
+          FROM generate_series(1, %(size)s) AS i
+    """, {'prefix': BENCH_PREFIX, 'uid': uid, 'size': size})
+
+    cr.execute("""
+        INSERT INTO library_member (name, email, barcode, user_id, created_date,
+                                    create_uid, write_uid, create_date, write_date)
+        SELECT %(prefix)s || ' Member ' || i,
+               'member' || i || '@bench.example',
+               %(prefix)s || '-' || i,
+               %(uid)s,
+               CURRENT_DATE - (i %% 730),
+               %(uid)s, %(uid)s, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC'
+          FROM generate_series(1, %(members)s) AS i
+    """, {'prefix': BENCH_PREFIX, 'uid': uid, 'members': members})
+
+    # Checkouts charge the members' budgets: give every seeded member one
+    cr.execute("SELECT id FROM library_member WHERE name LIKE %s AND budget_id IS NULL ORDER BY id",
+               [BENCH_PREFIX + ' %'])
+    member_ids = [row[0] for row in cr.fetchall()]
+    for chunk in split_every(1000, member_ids):
+        env['library.member'].browse(chunk)._provision_budgets()
+        env.flush_all()
+        env.invalidate_all()
+
+    # Returned loans spread over two years, plus one open loan for every
+    # tenth book (at most one open loan per book).
+    cr.execute("""
+        WITH books AS (
+            SELECT id, row_number() OVER (ORDER BY id) AS n
+              FROM library_book WHERE name LIKE %(pattern)s
+        ), mbrs AS (
+            SELECT id, row_number() OVER (ORDER BY id) - 1 AS n
+              FROM library_member WHERE name LIKE %(pattern)s
+        ), loans AS (
+            SELECT b.id AS book_id, b.n, k,
+                   CURRENT_DATE - ((b.n * 7 + k * 97) %% 730)::int AS borrow_date,
+                   (k = 2 AND b.n %% 10 = 0) AS open
+              FROM books b, generate_series(1, 2) AS k
+        )
+        INSERT INTO library_borrowing (member_id, book_id, borrow_date, due_date,
+                                       returned, return_date, borrow_price, amount,
+                                       create_uid, write_uid, create_date, write_date)
+        SELECT m.id, l.book_id,
+               CASE WHEN l.open THEN CURRENT_DATE - (l.n %% 30)::int ELSE l.borrow_date END,
+               CASE WHEN l.open THEN CURRENT_DATE - (l.n %% 30)::int + 14 ELSE l.borrow_date + 14 END,
+               NOT l.open,
+               CASE WHEN l.open THEN NULL ELSE l.borrow_date + 10 END,
+               5, 5,
+               %(uid)s, %(uid)s, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC'
+          FROM loans l
+          JOIN mbrs m ON m.n = (l.n * 31 + l.k) %% %(members)s
+    """, {'pattern': BENCH_PREFIX + ' %', 'uid': uid, 'members': members})
+
+    cr.execute("""
+        UPDATE library_book b SET status = 'checked_out'
+          FROM library_borrowing l
+         WHERE l.book_id = b.id AND NOT l.returned AND b.name LIKE %s
+    """, [BENCH_PREFIX + ' %'])
+
+    env.invalidate_all(flush=False)
+    for model_name in ('library.book', 'library.member', 'library.borrowing'):
+        recompute_stored(env, model_name)
+    cr.execute("ANALYZE library_book")
+    cr.execute("ANALYZE library_member")
+    cr.execute("ANALYZE library_borrowing")
+
+
+def recompute_stored(env, model_name, chunk_size=10000):
+    """Recompute the stored computed fields of the seeded rows, chunk by chunk"""
+    Model = env[model_name]
+    stored = [field for field in Model._fields.values() if field.store and field.compute]
+    env.cr.execute("SELECT id FROM %s ORDER BY id" % Model._table)
+    ids = [row[0] for row in env.cr.fetchall()]
+    for chunk in split_every(chunk_size, ids):
+        records = Model.browse(chunk)
+        for field in stored:
+            env.add_to_compute(field, records)
+        records.flush_recordset()
+        env.invalidate_all()
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+def _tree_fields(env, model_name):
+    views = env[model_name].get_views([(False, 'list')])
+    return list(views['models'][model_name])
+
+
+def bench_book_tree(env):
+    fields = _tree_fields(env, 'library.book')
+    env['library.book'].web_search_read([], fields, limit=80)
+
+
+def bench_member_tree(env):
+    fields = _tree_fields(env, 'library.member')
+    env['library.member'].web_search_read([], fields, limit=80)
+
+
+def bench_checkout(env):
+    member = env['library.member'].search([('name', 'like', BENCH_PREFIX + ' %')], limit=1)
+    books = env['library.book'].search([('status', '=', 'available')], limit=CHECKOUT_BOOKS)
+    wizard = env['library.book.borrow.wizard'].create({
+        'member_id': member.id,
+        'book_ids': [(6, 0, books.ids)],
+    })
+    wizard.action_borrow_books()
+    env.flush_all()
+
+
+def bench_return(env):
+    borrowings = env['library.borrowing'].search([('returned', '=', False)], limit=CHECKOUT_BOOKS)
+    wizard = env['library.book.return.wizard'].create({
+        'borrowing_ids': [(6, 0, borrowings.ids)],
+    })
+    wizard.action_return_books()
+    env.flush_all()
+
+
+def bench_dashboard(env):
+    Dashboard = env['library.dashboard']
+    Dashboard._refresh_materialized_view()
+    Dashboard.search_read([], [])
+
+
+SCENARIOS = {
+    'book_tree': bench_book_tree,
+    'member_tree': bench_member_tree,
+    'checkout_wizard': bench_checkout,
+    'return_wizard': bench_return,
+    'dashboard': bench_dashboard,
+}
+
+
+def run_scenario(env, func, repeat):
+    """Run a scenario ``repeat`` times, rolling back its writes after each run"""
+    cr = env.cr
+    runs = []
+    for _i in range(repeat):
+        env.invalidate_all()
+        cr.execute("SAVEPOINT library_benchmark")
+        try:
+            with Measure(cr) as measure:
+                func(env)
+        finally:
+            env.invalidate_all(flush=False)
+            cr.execute("ROLLBACK TO SAVEPOINT library_benchmark")
+        runs.append(measure)
+    return {
+        'queries': max(run.queries for run in runs),
+        'time_ms': round(statistics.median(run.elapsed for run in runs) * 1000, 2),
+    }
+
+
+def bench_web_catalog(url, repeat):
+    """Time ``/library/books`` on a running server, cold and revalidated"""
+    times, revalidated = [], []
+    etag = None
+    for _i in range(repeat):
+        start = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            response.read()
+            etag = response.headers.get('ETag')
+        times.append(time.perf_counter() - start)
+        if etag:
+            req = urllib.request.Request(url, headers={'If-None-Match': etag})
+            start = time.perf_counter()
+            try:
+                urllib.request.urlopen(req).read()
+            except urllib.error.HTTPError as error:
+                if error.code != 304:
+                    raise
+            revalidated.append(time.perf_counter() - start)
+    result = {'web_catalog': {'time_ms': round(statistics.median(times) * 1000, 2)}}
+    if revalidated:
+        result['web_catalog_304'] = {'time_ms': round(statistics.median(revalidated) * 1000, 2)}
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Concurrent checkouts
+# ---------------------------------------------------------------------------
+
+def _checkout_worker(registry, member_id, book_ids, stats, lock):
+    """Check the books out one by one, each in its own transaction"""
+    due_date = date.today() + timedelta(days=14)
+    for book_id in book_ids:
+        for _attempt in range(STRESS_RETRIES):
+            try:
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, SUPERUSER_ID, {})
+                    env['library.borrowing'].create({
+                        'member_id': member_id,
+                        'book_id': book_id,
+                        'due_date': due_date,
+                    })
+                outcome = 'succeeded'
+            except TransactionRollbackError:
+                # Serialization failure on the locked budget: retry, as Odoo does
+                with lock:
+                    stats['retries'] += 1
+                continue
+            except UserError:
+                outcome = 'rejected'
+            break
+        else:
+            outcome = 'gave_up'
+        with lock:
+            stats[outcome] += 1
+
+
+def stress_checkouts(registry, threads, checkouts, shared_member):
+    """Run ``threads`` x ``checkouts`` concurrent checkouts of 1.0 each.
+
+    With ``shared_member`` every thread checks out for the same member, so
+    they all charge one budget; otherwise each thread has its own member
+    and budget. Budgets only cover half of the checkouts.
+    """
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        Member = env['library.member']
+        member_count = 1 if shared_member else threads
+        members = Member.create([{
+            'name': '%s Stress Member %s' % (BENCH_PREFIX, index),
+            'user_id': env.uid,
+        } for index in range(member_count)])
+        members._provision_budgets()
+        budget_amount = threads * checkouts / 2.0 / member_count
+        members.budget_id.write({'amount': budget_amount})
+        books = env['library.book'].create([{
+            'name': '%s Stress Book %s' % (BENCH_PREFIX, index),
+            'author': 'Stress Author',
+            'borrow_price': 1.0,
+        } for index in range(threads * checkouts)])
+        member_ids, book_ids, budget_ids = members.ids, books.ids, members.budget_id.ids
+
+    stats = dict.fromkeys(('succeeded', 'rejected', 'gave_up', 'retries'), 0)
+    lock = threading.Lock()
+    workers = [
+        threading.Thread(target=_checkout_worker, args=(
+            registry, member_ids[index % len(member_ids)],
+            book_ids[index * checkouts:(index + 1) * checkouts], stats, lock))
+        for index in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        budgets = env['expense.budget'].browse(budget_ids)
+        borrowings = env['library.borrowing'].search([('book_id', 'in', book_ids)])
+        expenses = env['expense.tracker'].search([('budget_id', 'in', budget_ids)])
+        spent = {budget.id: 0.0 for budget in budgets}
+        for expense in expenses:
+            spent[expense.budget_id.id] += expense.amount
+        overspent = [budget.id for budget in budgets if spent[budget.id] > budget.amount + 1e-6]
+        # Remove everything the stress run committed
+        borrowings.unlink()
+        expenses.unlink()
+        env['library.member'].browse(member_ids).unlink()
+        budgets.unlink()
+        env['library.book'].browse(book_ids).unlink()
+
+    return dict(stats, **{
+        'threads': threads,
+        'budget': budget_amount,
+        'spent': round(max(spent.values()), 2),
+        'overspent_budgets': len(overspent),
+        'checkouts_per_sec': round(stats['succeeded'] / elapsed, 2) if elapsed else 0.0,
+    })
+
+
+# ---------------------------------------------------------------------------
+# Thresholds
+# ---------------------------------------------------------------------------
+
+def check_thresholds(results, thresholds):
+    """Return the list of scenarios that exceed their thresholds"""
+    failures = []
+    for name, limits in thresholds.items():
+        measured = results.get(name)
+        if not measured:
+            continue
+        for key, limit in limits.items():
+            if key in measured and measured[key] > limit:
+                failures.append("%s: %s %s > %s" % (name, key, measured[key], limit))
+    return failures
+
+
+def make_thresholds(results):
+    thresholds = {}
+    for name, measured in results.items():
+        limits = {}
+        if 'queries' in measured:
+            limits['queries'] = int(measured['queries'] * QUERY_SLACK) + 1
+        if 'time_ms' in measured:
+            limits['time_ms'] = round(measured['time_ms'] * TIME_SLACK, 2)
+        thresholds[name] = limits
+    return thresholds
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-c', '--config', help="Odoo configuration file")
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--addons-path')
+    parser.add_argument('--size', choices=sorted(SIZES), default='10k')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument('--url', help="Base URL of a running server, to benchmark /library/books")
+    parser.add_argument('--no-seed', action='store_true', help="Reuse the data already in the database")
+    parser.add_argument('--keep', action='store_true', help="Commit the seeded data instead of rolling back")
+    parser.add_argument('--stress', action='store_true', help="Also run the concurrent checkout stress test")
+    parser.add_argument('--stress-threads', type=int, default=8)
+    parser.add_argument('--stress-checkouts', type=int, default=25, help="Checkouts per thread")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--thresholds', help="JSON file with the regression thresholds")
+    parser.add_argument('--save-thresholds', action='store_true',
+                        help="Write the measured values (with slack) to --thresholds")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    odoo_args = ['-d', args.database]
+    if args.config:
+        odoo_args += ['-c', args.config]
+    if args.addons_path:
+        odoo_args += ['--addons-path', args.addons_path]
+    config.parse_config(odoo_args)
+    logging.basicConfig(level=logging.INFO)
+
+    results = {}
+    registry = odoo.registry(args.database)
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        if not args.no_seed:
+            with Measure(cr) as measure:
+                seed(env, SIZES[args.size])
+            _logger.info("Seeded in %.1fs", measure.elapsed)
+            if args.keep:
+                cr.commit()
+        for name in args.scenario or SCENARIOS:
+            results[name] = run_scenario(env, SCENARIOS[name], args.repeat)
+            _logger.info("%s: %s", name, results[name])
+        cr.rollback()
+
+    overspent = False
+    if args.stress:
+        for name, shared_member in (('stress_same_member', True), ('stress_different_members', False)):
+            results[name] = stress_checkouts(registry, args.stress_threads, args.stress_checkouts, shared_member)
+            _logger.info("%s: %s", name, results[name])
+            if results[name]['overspent_budgets']:
+                _logger.error("%s: a budget was overspent", name)
+                overspent = True
+
+    if args.url:
+        results.update(bench_web_catalog(args.url.rstrip('/') + '/library/books', args.repeat))
+
+    report = {
+        'database': args.database,
+        'size': args.size,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+    if overspent:
+        return 1
+    if not args.thresholds:
+        return 0
+    try:
+        with open(args.thresholds) as thresholds_file:
+            thresholds = json.load(thresholds_file)
+    except FileNotFoundError:
+        thresholds = {}
+    if args.save_thresholds:
+        thresholds[args.size] = make_thresholds(results)
+        with open(args.thresholds, 'w') as output:
+            json.dump(thresholds, output, indent=2, sort_keys=True)
+        return 0
+    failures = check_thresholds(results, thresholds.get(args.size, {}))
+    for failure in failures:
+        _logger.error("Regression: %s", failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,3 @@
+from . import library_web
+from . import library_api
+from . import library_metrics
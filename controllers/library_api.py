@@ -0,0 +1,119 @@
+import json
+
+from werkzeug.exceptions import BadRequest, Forbidden, NotFound
+
+import odoo
+from odoo import http
+from odoo.http import request
+from odoo.tools.date_utils import json_default
+
+from odoo.addons.Library_Manager.models.library_perf_stat import instrumented
+
+from .library_web import _to_int
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 2000
+
+# Resources exposed by the API: the table they are read from, the model
+# used for access checks and the columns a client may project on.
+# The rows are read in raw SQL, so record rules are not applied: public
+# resources are open to anyone (like the /library/books page), the others
+# are restricted to administrators.
+API_RESOURCES = {
+    'books': {
+        'model': 'library.book',
+        'table': 'library_book',
+        'public': True,
+        'fields': ['id', 'name', 'author', 'isbn', 'publisher', 'publication_year', 'edition',
+                   'pages', 'language', 'status', 'rating', 'borrow_price', 'added_date',
+                   'total_borrowings', 'popularity_score', 'last_borrowed_date', 'write_date'],
+    },
+    'members': {
+        'model': 'library.member',
+        'table': 'library_member',
+        'public': False,
+        'fields': ['id', 'name', 'email', 'phone', 'created_date', 'write_date'],
+    },
+    'borrowings': {
+        'model': 'library.borrowing',
+        'table': 'library_borrowing',
+        'public': False,
+        'fields': ['id', 'member_id', 'book_id', 'borrow_date', 'due_date', 'returned',
+                   'return_date', 'is_overdue', 'days_overdue', 'amount', 'write_date'],
+    },
+}
+
+
+def _select_query(table, columns):
+    """Keyset query over ``table``; columns are checked against API_RESOURCES."""
+    return 'SELECT {} FROM "{}" WHERE id > %s ORDER BY id LIMIT %s'.format(
+        ', '.join('"%s"' % column for column in columns), table)
+
+
+def _stream_ndjson(dbname, table, columns):
+    """Yield every row of ``table`` as NDJSON in id-ordered batches.
+
+    The generator runs after the request cursor is closed, so it reads through
+    its own cursor; only one batch is ever held in memory.
+    """
+    query = _select_query(table, columns)
+    with odoo.registry(dbname).cursor() as cr:
+        last_id = 0
+        while True:
+            cr.execute(query, [last_id, EXPORT_BATCH_SIZE])
+            rows = cr.dictfetchall()
+            if not rows:
+                break
+            yield ''.join(json.dumps(row, default=json_default) + '\n' for row in rows)
+            last_id = rows[-1]['id']
+
+
+class LibraryApiController(http.Controller):
+
+    def _get_resource(self, resource, fields=None):
+        """Return the resource definition and the projected columns"""
+        definition = API_RESOURCES.get(resource)
+        if not definition:
+            raise NotFound()
+        if not definition['public']:
+            if request.env.user._is_public():
+                raise NotFound()
+            if not request.env.user.has_group('base.group_system'):
+                raise Forbidden()
+            request.env[definition['model']].check_access_rights('read')
+
+        columns = ['id']
+        if fields:
+            for field in fields.split(','):
+                field = field.strip()
+                if field not in definition['fields']:
+                    raise BadRequest("Unknown field %r for %s" % (field, resource))
+                if field not in columns:
+                    columns.append(field)
+        else:
+            columns = list(definition['fields'])
+        return definition, columns
+
+    @http.route(['/library/api/<string:resource>'], type='http', auth='public', methods=['GET'], csrf=False)
+    @instrumented('api.list')
+    def library_api_list(self, resource, fields=None, after=None, limit=None, **kw):
+        definition, columns = self._get_resource(resource, fields)
+        limit = min(max(_to_int(limit, PAGE_SIZE), 1), MAX_PAGE_SIZE)
+
+        request.env[definition['model']].sudo().flush_model()
+        request.env.cr.execute(_select_query(definition['table'], columns), [_to_int(after, 0), limit])
+        records = request.env.cr.dictfetchall()
+        return request.make_json_response({
+            'records': records,
+            'next_after': records[-1]['id'] if len(records) == limit else None,
+        })
+
+    @http.route(['/library/api/<string:resource>/export'], type='http', auth='public', methods=['GET'], csrf=False)
+    def library_api_export(self, resource, fields=None, **kw):
+        definition, columns = self._get_resource(resource, fields)
+        return http.Response(
+            _stream_ndjson(request.env.cr.dbname, definition['table'], columns),
+            content_type='application/x-ndjson; charset=utf-8',
+            direct_passthrough=True,
+        )
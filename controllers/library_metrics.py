@@ -0,0 +1,55 @@
+import hmac
+
+from werkzeug.exceptions import Forbidden, NotFound
+
+from odoo import http
+from odoo.http import request
+
+from .library_web import _to_int
+
+# Metric name suffix, help text and column index in _get_window_stats rows
+METRICS = [
+    ('calls', "Calls of the operation", 1),
+    ('queries', "SQL queries run by the operation", 2),
+    ('sql_seconds', "Time spent in SQL", 3),
+    ('python_seconds', "Time spent outside SQL", 4),
+    ('rows', "Rows handled by the operation", 5),
+    ('max_seconds', "Slowest call of the operation", 6),
+]
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class LibraryMetricsController(http.Controller):
+
+    @http.route(['/library/metrics'], type='http', auth='public', methods=['GET'], csrf=False)
+    def library_metrics(self, token=None, window=None, **kw):
+        """Operation statistics in the Prometheus text format.
+
+        Disabled until a token is set in the library_manager.metrics_token
+        system parameter; scrapers pass it as a bearer token or ?token=.
+        """
+        expected = request.env['ir.config_parameter'].sudo().get_param('library_manager.metrics_token')
+        if not expected:
+            raise NotFound()
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):]
+        if not token or not hmac.compare_digest(token, expected):
+            raise Forbidden()
+
+        window = min(max(_to_int(window, 5), 1), 24 * 60)
+        rows = request.env['library.perf.stat'].sudo()._get_window_stats(window)
+        lines = []
+        for suffix, description, index in METRICS:
+            name = 'library_operation_%s' % suffix
+            lines.append('# HELP %s %s over the last %s minutes.' % (name, description, window))
+            lines.append('# TYPE %s gauge' % name)
+            for row in rows:
+                lines.append('%s{operation="%s"} %s' % (name, _label(row[0]), float(row[index] or 0)))
+        return request.make_response('\n'.join(lines) + '\n', headers=[
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+            ('Cache-Control', 'no-store'),
+        ])
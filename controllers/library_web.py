@@ -1,9 +1,94 @@
+import hashlib
+from urllib.parse import urlencode
+
+from werkzeug.http import http_date
+
 from odoo import http
 from odoo.http import request
+from odoo.tools.lru import LRU
+
+from odoo.addons.Library_Manager.models.library_perf_stat import instrumented
+
+PAGE_SIZE = 30
+MAX_PAGE_SIZE = 100
+CATALOG_FIELDS = ['name', 'author', 'status', 'rating', 'language']
+
+# Rendered catalog pages of this worker, keyed by database, language and
+# filters. Each entry is stamped with the catalog version, so any book
+# write or deletion (from any worker) makes it stale.
+_page_cache = LRU(256)
+
+
+def _to_int(value, default=None):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
 
 class LibraryWebsiteController(http.Controller):
 
+    def _is_not_modified(self, etag, last_modified):
+        httprequest = request.httprequest
+        if httprequest.if_none_match:
+            return httprequest.if_none_match.contains(etag)
+        since = httprequest.if_modified_since
+        return bool(since and last_modified and since.replace(tzinfo=None) >= last_modified.replace(microsecond=0))
+
+    def _get_catalog_domain(self, status=None, language=None, author=None, after=None):
+        domain = []
+        if status:
+            domain.append(('status', '=', status))
+        if language:
+            domain.append(('language', '=', language))
+        if author:
+            domain.append(('author', 'ilike', author))
+        if after:
+            # Keyset pagination: continue after the last book of the previous page
+            domain.append(('id', '<', after))
+        return domain
+
     @http.route(['/library/books'], type='http', auth='public', website=True)
-    def library_books_page(self, **kw):
-        books = request.env['library.book'].sudo().search([])
-        return request.render('Library_Manager.library_books_page', {'books': books})
+    @instrumented('web.books_page')
+    def library_books_page(self, status=None, language=None, author=None, after=None, limit=None, **kw):
+        after = _to_int(after)
+        limit = min(max(_to_int(limit, PAGE_SIZE), 1), MAX_PAGE_SIZE)
+        params = (status or '', language or '', author or '', after or 0, limit)
+
+        last_modified, stamp = request.env['library.book']._get_catalog_version()
+        key = (request.env.cr.dbname, request.env.lang) + params
+        etag = hashlib.sha1(repr((stamp,) + key).encode()).hexdigest()
+        headers = [('Cache-Control', 'public, max-age=60'), ('ETag', '"%s"' % etag)]
+        if last_modified:
+            headers.append(('Last-Modified', http_date(last_modified)))
+
+        if self._is_not_modified(etag, last_modified):
+            return request.make_response('', headers=headers, status=304)
+
+        cached = _page_cache.get(key)
+        if cached and cached[0] == stamp:
+            return request.make_response(cached[1], headers=headers)
+
+        domain = self._get_catalog_domain(status, language, author, after)
+        books = request.env['library.book'].sudo().search_read(
+            domain, CATALOG_FIELDS, limit=limit + 1, order='id desc')
+        next_url = None
+        if len(books) > limit:
+            books = books[:limit]
+            next_url = '/library/books?' + urlencode({
+                name: value for name, value in [
+                    ('status', status), ('language', language), ('author', author),
+                    ('limit', limit), ('after', books[-1]['id']),
+                ] if value
+            })
+
+        Book = request.env['library.book']
+        html = request.env['ir.qweb']._render('Library_Manager.library_books_page', {
+            'books': books,
+            'status_labels': dict(Book._fields['status']._description_selection(request.env)),
+            'language_labels': dict(Book._fields['language']._description_selection(request.env)),
+            'filters': {'status': status, 'language': language, 'author': author, 'limit': limit},
+            'next_url': next_url,
+        })
+        _page_cache[key] = (stamp, html)
+        return request.make_response(html, headers=headers)
@@ -1,5 +1,13 @@
+from . import library_perf_stat
+from . import library_bulk_mixin
 from . import library_book
 from . import library_borrowing
 from . import library_member
+from . import library_borrowing_history
 from . import library_dashboard
+from . import expense_budget
+from . import res_config_settings
+from . import library_mass_operation_job
+from . import library_reminder
+from . import library_reservation
 from . import wizard
\ No newline at end of file
@@ -0,0 +1,52 @@
+from odoo import models, fields
+
+
+class BudgetLedger:
+    """Running balance of the budgets charged by one checkout.
+
+    The remaining amounts are read once, then debited in memory book by
+    book, so a checkout of many books reads each budget a single time.
+    """
+
+    def __init__(self, budgets):
+        self.remaining = {budget.id: budget.remaining_amount for budget in budgets}
+
+    def debit(self, budget_id, amount):
+        """Take ``amount`` from the balance; False (and no debit) if it does not fit"""
+        if self.remaining.get(budget_id, 0.0) < amount:
+            return False
+        self.remaining[budget_id] -= amount
+        return True
+
+
+class ExpenseBudget(models.Model):
+    _inherit = 'expense.budget'
+
+    library_checkout_version = fields.Integer(string='Library Checkout Version', default=0, readonly=True, copy=False)
+
+    def _library_open_ledger(self):
+        """Lock these budgets for a checkout and return their BudgetLedger.
+
+        The budget rows are locked in id order and their version is bumped, so
+        checkouts charging the same budget are queued behind each other (and
+        retried by Odoo on a fresh snapshot), while checkouts on different
+        budgets never contend. The balances are read once, after the lock.
+        """
+        if not self:
+            return BudgetLedger(self)
+        self.env.cr.execute("""
+            WITH locked AS (
+                SELECT id FROM expense_budget
+                 WHERE id IN %s
+              ORDER BY id
+                   FOR NO KEY UPDATE
+            )
+            UPDATE expense_budget budget
+               SET library_checkout_version = budget.library_checkout_version + 1
+              FROM locked
+             WHERE budget.id = locked.id
+        """, [tuple(self.ids)])
+        self.invalidate_recordset()
+        # قراءة الرصيد والتصنيف مرة واحدة لكل الكتب
+        self.read(['remaining_amount', 'category_id'])
+        return BudgetLedger(self)
@@ -1,19 +1,93 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
 from datetime import date
+from dateutil.relativedelta import relativedelta
+import functools
+import logging
+import re
+import time
+
+from .library_perf_stat import instrumented
+
+# Chart data per database: (catalog stamp, expiry time, data)
+_chart_cache = {}
+CHART_CACHE_TTL = 60
+
+_logger = logging.getLogger(__name__)
+
+# Availability of the catalog per database, in this worker: a bytearray
+# indexed by book id (1 available, 2 not available, 0 unknown). Every
+# transaction changing statuses logs the book ids with its transaction id;
+# at most once per AVAILABILITY_CHECK_INTERVAL the worker reads the rows
+# committed since its last snapshot and patches only those books. The log
+# is purged after AVAILABILITY_LOG_RETENTION seconds, a worker that has not
+# caught up for half of that reloads the whole map.
+_availability = {}
+AVAILABILITY_CHECK_INTERVAL = 1
+AVAILABILITY_LOG_RETENTION = 3600
+AVAILABILITY_DIRTY_KEY = 'library.book.availability_dirty'
+AVAILABILITY_PENDING_KEY = 'library.book.availability_pending'
+
+# Text search configurations for the book languages (and user languages)
+TS_CONFIGS = {
+    'ar': 'arabic',
+    'en': 'english',
+    'fr': 'french',
+    'es': 'spanish',
+}
+
+
+def _isbn13_check_digit(digits):
+    total = sum(int(digit) * (3 if index % 2 else 1) for index, digit in enumerate(digits[:12]))
+    return str((10 - total % 10) % 10)
+
+
+def _log_availability_change(cr, book_ids):
+    """Log the books whose status changed (run in the transaction, on flush)"""
+    if book_ids:
+        cr.execute("INSERT INTO library_book_availability_log (book_id) SELECT unnest(%s::int[])",
+                   [sorted(book_ids)])
+
+
+def _expire_availability_check(dbname):
+    """Make this worker catch up with its own commit on the next lookup"""
+    entry = _availability.get(dbname)
+    if entry:
+        entry['checked'] -= AVAILABILITY_CHECK_INTERVAL
+
+
+def normalize_isbn(value):
+    """Return ``value`` as a bare ISBN-13, or False if it is not a valid ISBN.
+
+    Separators are ignored and ISBN-10 codes are converted, so "0-306-40615-2"
+    and "9780306406157" normalize to the same value.
+    """
+    code = re.sub(r'[^0-9X]', '', (value or '').upper())
+    if len(code) == 10:
+        if not code[:9].isdigit():
+            return False
+        total = sum((10 - index) * (10 if digit == 'X' else int(digit)) for index, digit in enumerate(code))
+        if total % 11:
+            return False
+        code = '978' + code[:9]
+        return code + _isbn13_check_digit(code)
+    if len(code) == 13 and code.isdigit() and _isbn13_check_digit(code) == code[12]:
+        return code
+    return False
 
 
 class LibraryBook(models.Model):
     _name = 'library.book'
     _description = 'Library Book'
     _order = 'create_date desc'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'library.bulk.mixin']
 
     # Basic Info
-    name = fields.Char(string='Title', required=True, tracking=True)
-    isbn = fields.Char(string='ISBN')
-    author = fields.Char(string='Author', required=True, tracking=True)
-    publisher = fields.Char(string='Publisher')
+    name = fields.Char(string='Title', required=True, tracking=True, index='trigram')
+    isbn = fields.Char(string='ISBN', index='trigram')
+    isbn_normalized = fields.Char(string='ISBN-13', compute='_compute_isbn_normalized', store=True, index=True)
+    author = fields.Char(string='Author', required=True, tracking=True, index='trigram')
+    publisher = fields.Char(string='Publisher', index='trigram')
     publication_year = fields.Integer(string='Publication Year')
     edition = fields.Char(string='Edition')
     pages = fields.Integer(string='Number of Pages')
@@ -21,7 +95,6 @@ class LibraryBook(models.Model):
     book_id = fields.Many2one(
     'library.book', 
     string='Book', 
-    required=True, 
     tracking=True
 )
     language = fields.Selection([
@@ -49,7 +122,7 @@ class LibraryBook(models.Model):
     notes = fields.Text(string='Notes')
     added_date = fields.Date(string='Added Date', default=fields.Date.today)
 
-    last_borrowed_date = fields.Date(string='Last Borrowed', compute='_compute_last_borrowed')
+    last_borrowed_date = fields.Date(string='Last Borrowed', compute='_compute_borrowing_totals', store=True, index=True)
 
     # Relations
     current_borrowing_id = fields.Many2one(
@@ -67,72 +140,224 @@ class LibraryBook(models.Model):
     # Computed Fields
     is_available = fields.Boolean(string='Is Available', compute='_compute_availability')
 
-    total_borrowings = fields.Integer(string='Total Times Borrowed', compute='_compute_borrowing_stats')
-    popularity_score = fields.Float(string='Popularity Score', compute='_compute_borrowing_stats')
+    total_borrowings = fields.Integer(string='Total Times Borrowed', compute='_compute_borrowing_totals', store=True, index=True)
+    popularity_score = fields.Float(string='Popularity Score', compute='_compute_borrowing_totals', store=True, index=True)
 
     active_borrowers_count = fields.Integer(
         string='Active Borrowers',
-        compute='_compute_borrowers_count'
+        compute='_compute_borrowing_stats'
     )
     total_borrowers_count = fields.Integer(
         string='Total Borrowers',
-        compute='_compute_borrowers_count'
+        compute='_compute_borrowing_stats'
     )
     current_borrower_ids = fields.Many2many(
         'library.member',
         string='Current Borrowers',
-        compute='_compute_current_borrowers'
+        compute='_compute_borrowing_stats'
     )
 
+    def init(self):
+        # MAX(write_date) and the deletion counter are the catalog version
+        # used by the public pages and the chart
+        tools.create_index(self.env.cr, 'library_book_write_date_index', self._table, ['write_date'])
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS library_book_catalog_state (
+                id integer PRIMARY KEY,
+                deletions bigint NOT NULL DEFAULT 0,
+                deleted_at timestamp
+            )
+        """)
+        self._init_search_vector()
+        self._init_availability_log()
+
+    def _init_availability_log(self):
+        """Create the log of status changes read by the availability maps"""
+        cr = self.env.cr
+        cr.execute("""
+            CREATE TABLE IF NOT EXISTS library_book_availability_log (
+                xid bigint NOT NULL DEFAULT txid_current(),
+                book_id integer NOT NULL,
+                create_date timestamp NOT NULL DEFAULT (now() AT TIME ZONE 'UTC')
+            )
+        """)
+        tools.create_index(cr, 'library_book_availability_log_xid_index',
+                           'library_book_availability_log', ['xid'])
+
+    @api.model
+    def _get_catalog_version(self):
+        """Return (last modification date, version string) of the catalog.
+
+        Deleting a book leaves MAX(write_date) unchanged, so unlink bumps a
+        counter that is part of the version.
+        """
+        self.env.cr.execute("""
+            SELECT (SELECT MAX(write_date) FROM library_book), deleted_at, deletions
+              FROM (VALUES (1)) AS singleton (id)
+         LEFT JOIN library_book_catalog_state state ON state.id = singleton.id
+        """)
+        last_write, deleted_at, deletions = self.env.cr.fetchone()
+        last_modified = max(filter(None, [last_write, deleted_at]), default=None)
+        version = '%s/%s' % (last_write and last_write.isoformat() or '', deletions or 0)
+        return last_modified, version
+
+    def _init_search_vector(self):
+        """Create the full-text search column maintained by PostgreSQL.
+
+        Title and author are indexed both stemmed in the book's language and
+        as plain words, so queries match whatever the user's language is.
+        """
+        cr = self.env.cr
+        if not tools.column_exists(cr, self._table, 'search_vector'):
+            config = "CASE language %s ELSE 'simple'::regconfig END" % ' '.join(
+                "WHEN '%s' THEN '%s'::regconfig" % item for item in TS_CONFIGS.items())
+            cr.execute("""
+                ALTER TABLE library_book ADD COLUMN search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector({config}, COALESCE(name, '')), 'A') ||
+                    setweight(to_tsvector('simple', COALESCE(name, '')), 'A') ||
+                    setweight(to_tsvector({config}, COALESCE(author, '')), 'B') ||
+                    setweight(to_tsvector('simple', COALESCE(author, '')), 'B') ||
+                    setweight(to_tsvector('simple', COALESCE(publisher, '')), 'C') ||
+                    setweight(to_tsvector('simple', COALESCE(isbn, '')), 'D')
+                ) STORED
+            """.format(config=config))
+        tools.create_index(cr, 'library_book_search_vector_index', self._table, ['search_vector'], method='gin')
+
+    @api.model
+    def _search_catalog(self, text, limit=100, domain=None, access_rights_uid=None):
+        """Return the ids of the books matching ``text``, best matches first.
+
+        Title, author, publisher and ISBN are matched through the full-text
+        column and by substring (so partial words still match), plus the
+        trigram similarity when pg_trgm is available. ``domain`` restricts
+        the books before they are ranked and limited.
+        """
+        self.flush_model(['name', 'author', 'publisher', 'isbn', 'language'])
+        user_config = TS_CONFIGS.get((self.env.lang or '')[:2], 'simple')
+        like = '%%%s%%' % text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        tsquery = "(plainto_tsquery('simple', %s) || plainto_tsquery(%s::regconfig, %s))"
+        tsquery_params = [text, user_config, text]
+
+        conditions = ["search_vector @@ " + tsquery, "name ILIKE %s", "author ILIKE %s",
+                      "publisher ILIKE %s", "isbn ILIKE %s"]
+        params = tsquery_params + [like] * 4
+        similarity, similarity_params = "0", []
+        if self.env.registry.has_trigram:
+            conditions += ["name %% %s", "author %% %s"]
+            params += [text, text]
+            similarity = "GREATEST(similarity(name, %s), similarity(author, %s))"
+            similarity_params = [text, text]
+
+        restriction = ""
+        if domain is not None:
+            subquery, subquery_params = self._search(domain, access_rights_uid=access_rights_uid).subselect()
+            restriction = "AND id IN ({})".format(subquery)
+            params += subquery_params
+
+        self.env.cr.execute("""
+            SELECT id
+              FROM library_book
+             WHERE ({match}) {restriction}
+          ORDER BY ts_rank(search_vector, {tsquery}) + {similarity} DESC, id DESC
+             LIMIT %s
+        """.format(match=' OR '.join(conditions), restriction=restriction, tsquery=tsquery, similarity=similarity),
+            params + tsquery_params + similarity_params + [limit])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _name_search(self, name, args=None, operator='ilike', limit=100, name_get_uid=None):
+        if not name or operator != 'ilike':
+            return super()._name_search(name, args=args, operator=operator, limit=limit, name_get_uid=name_get_uid)
+        # The caller's domain is applied in SQL, before ranking and limiting
+        return self._search_catalog(name, limit=limit, domain=list(args or []), access_rights_uid=name_get_uid)
+
+    @api.depends('isbn')
+    def _compute_isbn_normalized(self):
+        for book in self:
+            book.isbn_normalized = normalize_isbn(book.isbn)
+
+    @api.model
+    def find_by_isbn(self, code):
+        """Return the book with ISBN ``code``, written in any ISBN-10/13 form"""
+        isbn = normalize_isbn(code)
+        if not isbn:
+            return self.browse()
+        return self.search([('isbn_normalized', '=', isbn)], limit=1)
+
     @api.depends('status')
     def _compute_availability(self):
         for book in self:
             book.is_available = (book.status == 'available')
 
+    def _get_borrowing_stats(self):
+        """Return borrowing statistics for the whole recordset, keyed by book id.
+
+        All figures come from a single grouped query on live and archived
+        borrowings, so list views compute them in constant queries whatever
+        their size.
+        """
+        book_ids = [book_id for book_id in self._origin.ids if book_id]
+        if not book_ids:
+            return {}
+        self.env['library.borrowing'].flush_model(['book_id', 'member_id', 'borrow_date', 'returned'])
+        self.env.cr.execute("""
+            SELECT book_id,
+                   COUNT(*),
+                   MAX(borrow_date),
+                   COUNT(DISTINCT member_id),
+                   MIN(id) FILTER (WHERE NOT returned),
+                   ARRAY_AGG(DISTINCT member_id) FILTER (WHERE NOT returned)
+              FROM library_borrowing_all
+             WHERE book_id IN %s
+          GROUP BY book_id
+        """, [tuple(book_ids)])
+        stats = {}
+        for book_id, total, last_date, borrowers, current_id, current_members in self.env.cr.fetchall():
+            stats[book_id] = {
+                'total_borrowings': total,
+                'last_borrowed_date': last_date,
+                'total_borrowers_count': borrowers,
+                'current_borrowing_id': current_id or False,
+                'current_borrower_ids': current_members or [],
+            }
+        return stats
+
     @api.depends('borrowing_ids', 'borrowing_ids.returned')
+    @instrumented('book.compute_current_borrowing')
     def _compute_current_borrowing(self):
+        stats = self._get_borrowing_stats()
         for book in self:
-            borrowing = self.env['library.borrowing'].search([
-                ('book_id', '=', book.id),
-                ('returned', '=', False)
-            ], limit=1)
-            book.current_borrowing_id = borrowing
+            book.current_borrowing_id = stats.get(book._origin.id, {}).get('current_borrowing_id', False)
 
-    @api.depends('borrowing_ids')
-    def _compute_borrowing_stats(self):
+    @api.depends('borrowing_ids', 'borrowing_ids.borrow_date')
+    @instrumented('book.compute_borrowing_totals')
+    def _compute_borrowing_totals(self):
+        # Stored so popularity filters, ordering and grouping run in SQL; the
+        # ORM only recomputes the books whose borrowings were touched.
+        stats = self._get_borrowing_stats()
         for book in self:
-            book.total_borrowings = len(book.borrowing_ids)
+            book_stats = stats.get(book._origin.id, {})
+            book.total_borrowings = book_stats.get('total_borrowings', 0)
             # Simple popularity score based on number of borrowings
             book.popularity_score = book.total_borrowings * 0.1
+            book.last_borrowed_date = book_stats.get('last_borrowed_date', False)
 
-    @api.depends('borrowing_ids.borrow_date')
-    def _compute_last_borrowed(self):
-        for book in self:
-            last_borrowing = self.env['library.borrowing'].search([
-                ('book_id', '=', book.id)
-            ], order='borrow_date desc', limit=1)
-            book.last_borrowed_date = last_borrowing.borrow_date if last_borrowing else False
-
-    @api.depends('borrowing_ids.member_id', 'borrowing_ids.returned')
-    def _compute_borrowers_count(self):
-        for book in self:
-            # Count active borrowers (currently borrowing)
-            active_borrowings = book.borrowing_ids.filtered(lambda b: not b.returned)
-            book.active_borrowers_count = len(active_borrowings.mapped('member_id'))
-
-            # Count total unique borrowers
-            all_borrowers = book.borrowing_ids.mapped('member_id')
-            book.total_borrowers_count = len(set(all_borrowers.ids))
-
-    @api.depends('borrowing_ids.member_id', 'borrowing_ids.returned')
-    def _compute_current_borrowers(self):
+    @api.depends('borrowing_ids', 'borrowing_ids.member_id', 'borrowing_ids.returned')
+    @instrumented('book.compute_borrowing_stats')
+    def _compute_borrowing_stats(self):
+        stats = self._get_borrowing_stats()
         for book in self:
-            active_borrowings = book.borrowing_ids.filtered(lambda b: not b.returned)
-            book.current_borrower_ids = active_borrowings.mapped('member_id')
+            book_stats = stats.get(book._origin.id, {})
+            book.total_borrowers_count = book_stats.get('total_borrowers_count', 0)
+            current_members = book_stats.get('current_borrower_ids', [])
+            book.active_borrowers_count = len(current_members)
+            book.current_borrower_ids = [(6, 0, current_members)]
 
     # SQL Constraints
     _sql_constraints = [
-        ('isbn_unique', 'unique(isbn)', 'The ISBN must be unique!')
+        ('isbn_unique', 'unique(isbn)', 'The ISBN must be unique!'),
+        ('isbn_normalized_unique', 'unique(isbn_normalized)', 'The ISBN must be unique!'),
     ]
 
     # Date Validation
@@ -142,6 +367,12 @@ class LibraryBook(models.Model):
             if record.added_date and record.added_date > date.today():
                 raise ValidationError(_('The added date cannot be in the future.'))
 
+    @api.constrains('isbn')
+    def _check_isbn(self):
+        for record in self:
+            if record.isbn and not record.isbn_normalized:
+                raise ValidationError(_("Invalid ISBN '%s'.") % record.isbn)
+
     @api.constrains('publication_year')
     def _check_publication_year(self):
         for record in self:
@@ -157,6 +388,115 @@ class LibraryBook(models.Model):
             if book.rating and str(book.rating) not in valid_values:
                 raise ValidationError(_("Invalid rating value for book '%s'.") % book.name)
 
+    def write(self, vals):
+        freed = self.browse()
+        if 'status' in vals:
+            self._invalidate_availability()
+            if vals['status'] == 'available':
+                freed = self.filtered(lambda book: book.status != 'available')
+        result = super(LibraryBook, self).write(vals)
+        # تسليم الكتب التي أصبحت متاحة لأول من ينتظرها في قائمة الحجز
+        if freed:
+            self.env['library.reservation']._dispatch(freed)
+        return result
+
+    def unlink(self):
+        if self:
+            self.env.cr.execute("""
+                INSERT INTO library_book_catalog_state (id, deletions, deleted_at)
+                VALUES (1, 1, now() AT TIME ZONE 'UTC')
+                ON CONFLICT (id) DO UPDATE
+                   SET deletions = library_book_catalog_state.deletions + 1,
+                       deleted_at = EXCLUDED.deleted_at
+            """)
+        return super(LibraryBook, self).unlink()
+
+    def _invalidate_availability(self):
+        """Bypass the availability map for these books until the end of the
+        transaction, and log them for the other workers.
+
+        The bypass lives in ``cr.postcommit.data``, which flushes and
+        savepoints leave alone; the pending log rows are written by a
+        precommit callback, so they are dropped with a rolled back savepoint.
+        """
+        cr = self.env.cr
+        book_ids = self._origin.ids
+        cr.postcommit.data.setdefault(AVAILABILITY_DIRTY_KEY, set()).update(book_ids)
+        pending = cr.precommit.data.get(AVAILABILITY_PENDING_KEY)
+        if pending is None:
+            pending = cr.precommit.data[AVAILABILITY_PENDING_KEY] = set()
+            cr.precommit.add(functools.partial(_log_availability_change, cr, pending))
+            cr.postcommit.add(functools.partial(_expire_availability_check, cr.dbname))
+        pending.update(book_ids)
+
+    @api.model
+    def _get_availability_map(self):
+        """The worker's availability bytearray, patched if it is outdated"""
+        dbname = self.env.cr.dbname
+        entry = _availability.get(dbname)
+        now = time.monotonic()
+        if entry and now - entry['checked'] < AVAILABILITY_CHECK_INTERVAL:
+            return entry['map']
+        # Fresh cursor: its snapshot tells which log rows are new next time
+        with self.env.registry.cursor() as cr:
+            cr.execute("SELECT txid_current_snapshot()::text")
+            snapshot = cr.fetchone()[0]
+            if not entry or now - entry['checked'] >= AVAILABILITY_LOG_RETENTION / 2:
+                cr.execute("SELECT id, status = 'available' FROM library_book ORDER BY id")
+                rows = cr.fetchall()
+                availability = bytearray(rows[-1][0] + 1 if rows else 0)
+                changed = ()
+            else:
+                # Rows of the transactions committed since the last snapshot
+                cr.execute("""
+                    SELECT DISTINCT book_id
+                      FROM library_book_availability_log
+                     WHERE xid >= txid_snapshot_xmin(%(snapshot)s::txid_snapshot)
+                       AND NOT txid_visible_in_snapshot(xid, %(snapshot)s::txid_snapshot)
+                """, {'snapshot': entry['snapshot']})
+                changed = [row[0] for row in cr.fetchall()]
+                rows = []
+                if changed:
+                    cr.execute("SELECT id, status = 'available' FROM library_book WHERE id = ANY(%s)",
+                               [changed])
+                    rows = cr.fetchall()
+                availability = entry['map']
+        for book_id in changed:
+            # Deleted books become unknown
+            if book_id < len(availability):
+                availability[book_id] = 0
+        for book_id, available in rows:
+            if book_id >= len(availability):
+                availability.extend(bytes(book_id + 1 - len(availability)))
+            availability[book_id] = 1 if available else 2
+        _availability[dbname] = {'snapshot': snapshot, 'checked': now, 'map': availability}
+        return availability
+
+    def _get_availability(self):
+        """Map book id -> whether it is available.
+
+        Answered from the worker's availability map; only the books changed
+        by the current transaction or unknown to the map are read.
+        """
+        availability = self._get_availability_map()
+        dirty = self.env.cr.postcommit.data.get(AVAILABILITY_DIRTY_KEY, ())
+        result = {}
+        missing = []
+        for book_id in filter(None, self._origin.ids):
+            state = availability[book_id] if book_id < len(availability) else 0
+            if state and book_id not in dirty:
+                result[book_id] = state == 1
+            else:
+                missing.append(book_id)
+        for book in self.browse(missing):
+            result[book.id] = book.status == 'available'
+        return result
+
+    @api.model
+    def _cron_purge_availability_log(self):
+        self.env.cr.execute("DELETE FROM library_book_availability_log WHERE create_date < %s",
+                            [fields.Datetime.now() - relativedelta(seconds=AVAILABILITY_LOG_RETENTION)])
+
     # Actions
     def action_mark_available(self):
         self.write({'status': 'available'})
@@ -198,19 +538,62 @@ class LibraryBook(models.Model):
         }
 
     def action_view_borrowing_history(self):
-        """Smart button action - Show complete borrowing history"""
+        """Smart button action - Show complete borrowing history, archived included"""
         self.ensure_one()
         return {
             'type': 'ir.actions.act_window',
             'name': _('Borrowing History of "%s"') % self.name,
-            'res_model': 'library.borrowing',
-            'view_mode': 'tree,form,graph,pivot',
+            'res_model': 'library.borrowing.all',
+            'view_mode': 'tree,pivot,graph',
             'domain': [('book_id', '=', self.id)],
-            'context': {
-                'default_book_id': self.id,
-                'search_default_filter_active': 1,
-            },
         }
+
+    @api.model
+    def get_chart_data(self):
+        """Return the histograms shown by the library chart action.
+
+        Book counts per status, language and rating come from one GROUPING
+        SETS scan, borrowings per month for the last year (archived included)
+        from one grouped query. The result is cached for a short while per catalog version.
+        """
+        self.check_access_rights('read')
+        self.flush_model()
+        self.env['library.borrowing'].flush_model(['borrow_date'])
+        cr = self.env.cr
+        stamp = self._get_catalog_version()[1]
+        cached = _chart_cache.get(cr.dbname)
+        if cached and cached[0] == stamp and cached[1] > time.monotonic():
+            return cached[2]
+
+        data = {'status': {}, 'language': {}, 'rating': {}, 'monthly_borrowings': []}
+        cr.execute("""
+            SELECT CASE WHEN GROUPING(status) = 0 THEN 'status'
+                        WHEN GROUPING(language) = 0 THEN 'language'
+                        ELSE 'rating' END,
+                   COALESCE(status, language, rating),
+                   COUNT(*)
+              FROM library_book
+          GROUP BY GROUPING SETS ((status), (language), (rating))
+        """)
+        for histogram, value, count in cr.fetchall():
+            data[histogram][value or 'none'] = count
+
+        date_from = fields.Date.today().replace(day=1) - relativedelta(months=11)
+        cr.execute("""
+            SELECT date_trunc('month', borrow_date)::date AS month, COUNT(*)
+              FROM library_borrowing_all
+             WHERE borrow_date >= %s
+          GROUP BY month
+          ORDER BY month
+        """, [date_from])
+        data['monthly_borrowings'] = [
+            {'month': fields.Date.to_string(month), 'count': count}
+            for month, count in cr.fetchall()
+        ]
+
+        _chart_cache[cr.dbname] = (stamp, time.monotonic() + CHART_CACHE_TTL, data)
+        return data
+
     # Display format for dropdowns and relations
     def name_get(self):
         result = []
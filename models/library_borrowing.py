@@ -1,13 +1,16 @@
-from odoo import models, fields, api,_
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
+from collections import Counter
 from datetime import datetime, timedelta
 
+from .library_perf_stat import instrumented, measure_operation
+
 
 class LibraryBorrowing(models.Model):
     _name = 'library.borrowing'
     _description = 'Book Borrowing'
     _order = 'borrow_date desc'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'library.bulk.mixin']
 
     member_id = fields.Many2one('library.member', string='Member', required=True, tracking=True)
     book_id = fields.Many2one('library.book', string='Book', required=True, tracking=True)
@@ -17,8 +20,8 @@ class LibraryBorrowing(models.Model):
     return_date = fields.Date(string='Return Date', tracking=True)
 
     # Computed fields
-    is_overdue = fields.Boolean(string='Is Overdue', compute='_compute_overdue')
-    days_overdue = fields.Integer(string='Days Overdue', compute='_compute_overdue')
+    is_overdue = fields.Boolean(string='Is Overdue', compute='_compute_overdue', store=True, index=True)
+    days_overdue = fields.Integer(string='Days Overdue', compute='_compute_overdue', store=True)
 
     # price = fields.Float(string='Borrowing Price', required=True, tracking=True, help="Cost to borrow this book.")
 
@@ -26,8 +29,22 @@ class LibraryBorrowing(models.Model):
     expense_id = fields.Many2one('expense.tracker', string='Related Expense', readonly=True)
     borrow_price = fields.Float(string="Borrow Price", default=0.0, required=True, tracking=True, help="Cost to borrow this book.")
     expense_budget_id = fields.Many2one('expense.budget', string='Related Budget', ondelete='set null')
-
-
+    notes = fields.Text(string='Notes')
+
+    _sql_constraints = [
+        # Backed by a partial btree index on book_id for open loans, so two
+        # desks checking out the same book cannot both succeed.
+        ('open_book_unique', 'EXCLUDE (book_id WITH =) WHERE (returned = false)',
+         'This book is already borrowed and not yet returned.'),
+    ]
+
+    def init(self):
+        # Open loans are a small slice of the table; keep their due dates
+        # in a dedicated index for overdue lookups and the nightly rollover.
+        tools.create_index(
+            self.env.cr, 'library_borrowing_open_due_date_index',
+            self._table, ['due_date'], where='returned = false',
+        )
 
     @api.onchange('book_id')
     def _onchange_book_id(self):
@@ -57,45 +74,96 @@ class LibraryBorrowing(models.Model):
                     record.days_overdue = 0
 
     @api.model
-    def create(self, vals):
+    def _cron_update_overdue(self):
+        """Roll the stored overdue flags over to the current date.
 
-        if not vals.get('due_date'):
-            borrow_date = vals.get('borrow_date') or fields.Date.today()
-            if isinstance(borrow_date, str):
-                borrow_date = fields.Date.from_string(borrow_date)
-            vals['due_date'] = borrow_date + timedelta(days=14)
+        is_overdue/days_overdue only depend on the date for open loans, so a
+        single set-based UPDATE is enough to keep them in sync every day.
+        """
+        today = fields.Date.today()
+        self.flush_model(['due_date', 'returned', 'is_overdue', 'days_overdue'])
+        self.env.cr.execute("""
+            UPDATE library_borrowing
+               SET is_overdue = (returned = false AND due_date < %(today)s),
+                   days_overdue = CASE WHEN returned = false AND due_date < %(today)s
+                                       THEN %(today)s - due_date ELSE 0 END
+             WHERE (returned = false AND due_date < %(today)s)
+                OR is_overdue = true
+        """, {'today': today})
+        self.invalidate_model(['is_overdue', 'days_overdue'])
+
+    @api.model_create_multi
+    @instrumented('borrowing.create')
+    def create(self, vals_list):
+        if not vals_list:
+            return self.browse()
+        vals_list = [self._add_missing_default_values(vals) for vals in vals_list]
+        for vals in vals_list:
+            if not vals.get('due_date'):
+                borrow_date = vals.get('borrow_date') or fields.Date.today()
+                if isinstance(borrow_date, str):
+                    borrow_date = fields.Date.from_string(borrow_date)
+                vals['due_date'] = borrow_date + timedelta(days=14)
+
+        # تسجيل المصروفات للدفعة كاملة قبل إنشاء السجلات
+        expenses = self._checkout_batch(vals_list)
+        for vals, expense in zip(vals_list, expenses):
+            vals['expense_id'] = expense.id
+
+        return super(LibraryBorrowing, self).create(vals_list)
 
-        # إنشاء السجل أولاً
-        record = super(LibraryBorrowing, self).create(vals)
+    @api.model
+    def _checkout_batch(self, vals_list):
+        """Check out a batch of books and charge their members' budgets.
 
-        # التحقق من وجود budget للعضو
-        if not record.member_id.budget_id:
-            raise ValidationError(_("Member has no budget assigned. Please create a budget first."))
+        Each budget is locked and read once, then debited in memory book by
+        book; the books are flagged as checked out with one write and the
+        expenses are created with one call, only once the whole batch fits.
+        Returns the expenses in the order of ``vals_list``.
+        """
+        members = self.env['library.member'].browse([vals['member_id'] for vals in vals_list])
+        books = self.env['library.book'].browse([vals['book_id'] for vals in vals_list])
 
-        budget = record.member_id.budget_id
-        book_price = record.book_id.borrow_price
+        with measure_operation(self.env, 'checkout.availability', rows=len(books)):
+            self._check_book_availability(books)
 
-        # التحقق من الرصيد الكافي
-        if budget.remaining_amount < book_price:
-            raise ValidationError(_("This member doesn't have enough budget to borrow this book."))
+        if members._is_lazy_budget():
+            members.browse(set(members.ids))._provision_budgets()
 
-        # تحديث حالة الكتاب إلى "مستعار"
-        record.book_id.write({'status': 'checked_out'})
+        # التحقق من وجود budget للعضو
+        if any(not member.budget_id for member in members):
+            raise ValidationError(_("Member has no budget assigned. Please create a budget first."))
 
-        # إنشاء Expense جديد
-        expense_vals ={
-            'name': 'Borrowed Book: {}'.format(record.book_id.name),
-            'amount': book_price,
+        # حجز المبلغ من الميزانية: رصيد جارٍ في الذاكرة، ولا شيء يُكتب
+        # قبل التأكد من أن كل الكتب تكفيها الميزانية
+        with measure_operation(self.env, 'checkout.budget', rows=len(books)):
+            ledger = members.budget_id._library_open_ledger()
+            for member, book in zip(members, books):
+                if not ledger.debit(member.budget_id.id, book.borrow_price):
+                    raise ValidationError(_("%s doesn't have enough budget to borrow %s.") % (member.name, book.name))
+
+        # تحديث حالة الكتب إلى "مستعار"
+        with measure_operation(self.env, 'checkout.book_status', rows=len(books)):
+            books.write({'status': 'checked_out'})
+
+        # إنشاء Expenses جديدة
+        with measure_operation(self.env, 'checkout.expense', rows=len(books)):
+            return self.env['expense.tracker'].create([
+                self._prepare_expense_vals(book, member.budget_id)
+                for member, book in zip(members, books)
+            ])
+
+    @api.model
+    def _prepare_expense_vals(self, book, budget):
+        return {
+            'name': 'Borrowed Book: {}'.format(book.name),
+            'amount': book.borrow_price,
             'category_id': budget.category_id.id,
             'budget_id': budget.id,
             'date': fields.Date.today(),
             'state': 'approved',  # إضافة حالة لتجنب الأخطاء
-            'title': 'Book Borrowing: {}'.format(record.book_id.name)  # إضافة حقل مطلوب
+            'title': 'Book Borrowing: {}'.format(book.name)  # إضافة حقل مطلوب
         }
-        expense = record.env['expense.tracker'].create(expense_vals)
-        record.expense_id = expense.id
-
-        return record
         # Set default due date (14 days from now)
     #     if not vals.get('due_date'):
     #         borrow_date = vals.get('borrow_date') or fields.Date.today()
@@ -173,14 +241,34 @@ class LibraryBorrowing(models.Model):
     #     return record
 
     def action_return_book(self):
-        for record in self:
-            if not record.returned:
-                record.write({
-                    'returned': True,
-                    'return_date': fields.Date.today()
-                })
-                # Update book status
-                record.book_id.write({'status': 'available'})
+        self._return_books(fields.Date.today())
+
+    @instrumented('borrowing.return')
+    def _return_books(self, return_date):
+        """Return all open borrowings of the recordset and free their books."""
+        open_borrowings = self.filtered(lambda record: not record.returned)
+        if not open_borrowings:
+            return open_borrowings
+        open_borrowings.write({
+            'returned': True,
+            'return_date': return_date,
+        })
+        # Update book status (the reservation queues are served by the write)
+        open_borrowings.book_id.write({'status': 'available'})
+        return open_borrowings
+
+    def _get_overdue_days(self, return_date):
+        """Total number of days past due of the recordset at ``return_date``."""
+        borrowing_ids = [borrowing_id for borrowing_id in self._origin.ids if borrowing_id]
+        if not borrowing_ids or not return_date:
+            return 0
+        self.flush_model(['due_date'])
+        self.env.cr.execute("""
+            SELECT COALESCE(SUM(GREATEST(%s::date - due_date, 0)), 0)
+              FROM library_borrowing
+             WHERE id IN %s
+        """, [return_date, tuple(borrowing_ids)])
+        return self.env.cr.fetchone()[0]
 
     def name_get(self):
         result = []
@@ -196,14 +284,23 @@ class LibraryBorrowing(models.Model):
             ('due_date', '<', fields.Date.today())
         ])
 
-    @api.constrains('book_id', 'returned')
-    def _check_book_availability(self):
-        for rec in self:
-            if not rec.returned:
-                existing = self.search([
-                    ('book_id', '=', rec.book_id.id),
-                    ('returned', '=', False),
-                    ('id', '!=', rec.id)
-                ])
-                if existing:
-                    raise ValidationError(_('This book is already borrowed and not yet returned.'))
\ No newline at end of file
+    @api.model
+    def _check_book_availability(self, books):
+        """Make sure none of ``books`` is already on an open loan.
+
+        The open_book_unique constraint is what actually prevents double
+        loans; this pre-check only names the offending books for the user.
+        """
+        self.flush_model(['book_id', 'returned'])
+        self.env.cr.execute("""
+            SELECT DISTINCT book_id
+              FROM library_borrowing
+             WHERE book_id IN %s AND returned = false
+        """, [tuple(set(books.ids))])
+        borrowed_ids = {row[0] for row in self.env.cr.fetchall()}
+        borrowed_ids.update(book_id for book_id, count in Counter(books.ids).items() if count > 1)
+        if borrowed_ids:
+            raise ValidationError(_(
+                "The following books are already borrowed and not yet returned: %s") %
+                ', '.join(books.browse(sorted(borrowed_ids)).mapped('name'))
+            )
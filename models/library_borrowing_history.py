@@ -0,0 +1,132 @@
+import logging
+import time
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+# Time an archival cron run may spend before handing over to a new run
+MAX_RUN_SECONDS = 120
+
+
+class LibraryBorrowingHistory(models.Model):
+    _name = 'library.borrowing.history'
+    _description = 'Archived Book Borrowing'
+    _order = 'borrow_date desc'
+
+    # Archived rows keep the id they had in library_borrowing
+    member_id = fields.Many2one('library.member', string='Member', readonly=True, index=True, ondelete='cascade')
+    book_id = fields.Many2one('library.book', string='Book', readonly=True, index=True, ondelete='cascade')
+    borrow_date = fields.Date(string='Borrow Date', readonly=True)
+    due_date = fields.Date(string='Due Date', readonly=True)
+    return_date = fields.Date(string='Return Date', readonly=True, index=True)
+    amount = fields.Float(string='Borrowing Amount', readonly=True)
+    borrow_price = fields.Float(string='Borrow Price', readonly=True)
+    expense_id = fields.Many2one('expense.tracker', string='Related Expense', readonly=True, ondelete='set null')
+    notes = fields.Text(string='Notes', readonly=True)
+    archived_date = fields.Date(string='Archived On', readonly=True)
+
+    def name_get(self):
+        result = []
+        for record in self:
+            name = "{} - {}".format(record.book_id.name, record.member_id.name)
+            result.append((record.id, name))
+        return result
+
+    @api.model
+    def _get_archive_cutoff(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        months = int(ICP.get_param('library_manager.archive_months', 12) or 0)
+        return fields.Date.today() - relativedelta(months=months) if months > 0 else False
+
+    @api.model
+    def _archive_batch(self, cutoff, batch_size=10000):
+        """Move one batch of old returned borrowings to the history table.
+
+        Returns the number of borrowings moved.
+        """
+        self.env['library.borrowing'].flush_model()
+        cr = self.env.cr
+        cr.execute("""
+            WITH moved AS (
+                DELETE FROM library_borrowing
+                 WHERE id IN (
+                        SELECT id FROM library_borrowing
+                         WHERE returned = true AND return_date < %(cutoff)s
+                      ORDER BY id
+                         LIMIT %(limit)s
+                           FOR UPDATE SKIP LOCKED
+                 )
+             RETURNING id, member_id, book_id, borrow_date, due_date, return_date, amount,
+                       borrow_price, expense_id, notes, create_uid, create_date, write_uid, write_date
+            )
+            INSERT INTO library_borrowing_history (
+                id, member_id, book_id, borrow_date, due_date, return_date, amount,
+                borrow_price, expense_id, notes, create_uid, create_date, write_uid, write_date,
+                archived_date
+            )
+            SELECT moved.*, %(today)s FROM moved
+            RETURNING id
+        """, {'cutoff': cutoff, 'limit': batch_size, 'today': fields.Date.today()})
+        moved_ids = tuple(row[0] for row in cr.fetchall())
+        if not moved_ids:
+            return 0
+
+        # Keep the chatter of archived borrowings, drop what only live records need
+        cr.execute("""
+            UPDATE mail_message SET model = %s
+             WHERE model = 'library.borrowing' AND res_id IN %s
+        """, [self._name, moved_ids])
+        cr.execute("DELETE FROM mail_followers WHERE res_model = 'library.borrowing' AND res_id IN %s", [moved_ids])
+        cr.execute("DELETE FROM mail_activity WHERE res_model = 'library.borrowing' AND res_id IN %s", [moved_ids])
+        self.env.invalidate_all()
+        return len(moved_ids)
+
+    @api.model
+    def _cron_archive_borrowings(self):
+        cutoff = self._get_archive_cutoff()
+        if not cutoff:
+            return
+        deadline = time.monotonic() + MAX_RUN_SECONDS
+        total = 0
+        while time.monotonic() < deadline:
+            moved = self._archive_batch(cutoff)
+            if not moved:
+                return
+            total += moved
+            self.env.cr.commit()
+            _logger.info("Library archival: %s borrowings moved to history", total)
+        self.env.ref('Library_Manager.ir_cron_archive_library_borrowings')._trigger()
+
+
+class LibraryBorrowingAll(models.Model):
+    _name = 'library.borrowing.all'
+    _description = 'Borrowing History (Live and Archived)'
+    _auto = False
+    _order = 'borrow_date desc'
+
+    member_id = fields.Many2one('library.member', string='Member', readonly=True)
+    book_id = fields.Many2one('library.book', string='Book', readonly=True)
+    borrow_date = fields.Date(string='Borrow Date', readonly=True)
+    due_date = fields.Date(string='Due Date', readonly=True)
+    returned = fields.Boolean(string='Returned', readonly=True)
+    return_date = fields.Date(string='Return Date', readonly=True)
+    amount = fields.Float(string='Borrowing Amount', readonly=True)
+    archived = fields.Boolean(string='Archived', readonly=True)
+
+    def init(self):
+        # Ids are shared: a borrowing is either live or archived
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW library_borrowing_all AS (
+                SELECT id, member_id, book_id, borrow_date, due_date, returned,
+                       return_date, amount, false AS archived
+                  FROM library_borrowing
+                UNION ALL
+                SELECT id, member_id, book_id, borrow_date, due_date, true AS returned,
+                       return_date, amount, true AS archived
+                  FROM library_borrowing_history
+            )
+        """)
@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+from odoo import models, api, _
+
+from .library_perf_stat import instrumented
+
+# Records named in a summary note before "and N more"
+SUMMARY_NAMES = 20
+
+
+class LibraryBulkMixin(models.AbstractModel):
+    _name = 'library.bulk.mixin'
+    _description = 'Library Bulk Operations Mixin'
+
+    @api.model
+    def _get_bulk_tracking_mode(self):
+        """How bulk operations handle mail tracking: track, summary or skip"""
+        return self.env['ir.config_parameter'].sudo().get_param('library_manager.bulk_tracking', 'summary')
+
+    def _with_bulk_context(self):
+        """Return the recordset in bulk mode, for wizards, crons and imports.
+
+        Unless bulk tracking is set to "track", field tracking, creation logs
+        and auto-subscription are disabled for the operation.
+        """
+        context = {'library_bulk_mode': True}
+        if self._get_bulk_tracking_mode() != 'track':
+            context.update({
+                'tracking_disable': True,
+                'mail_notrack': True,
+                'mail_create_nolog': True,
+                'mail_create_nosubscribe': True,
+            })
+        return self.with_context(**context)
+
+    @instrumented('mail.bulk_summary')
+    def _log_bulk_summary(self, body, anchor):
+        """Log a bulk operation on the records, only in bulk mode.
+
+        With "summary", one note naming the records is posted on ``anchor``
+        (the member of a checkout, the job of a mass operation): a record,
+        or a function giving the anchor of each record, in which case every
+        anchor gets one note. With "record", each record gets its own note,
+        all logged in a single batch.
+        """
+        if not self or not self.env.context.get('library_bulk_mode'):
+            return
+        mode = self._get_bulk_tracking_mode()
+        if mode == 'record':
+            self._message_log_batch(bodies=dict.fromkeys(self.ids, body))
+        elif mode == 'summary':
+            groups = defaultdict(list)
+            for record in self:
+                groups[anchor(record) if callable(anchor) else anchor].append(record.display_name)
+            bodies = {}
+            for target, names in groups.items():
+                text = ', '.join(names[:SUMMARY_NAMES])
+                if len(names) > SUMMARY_NAMES:
+                    text = _("%s and %s more") % (text, len(names) - SUMMARY_NAMES)
+                bodies[target.id] = "%s (%s): %s" % (body, len(names), text)
+            targets = next(iter(groups))
+            targets.browse(list(bodies))._message_log_batch(bodies=bodies)
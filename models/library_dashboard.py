@@ -1,9 +1,22 @@
 from odoo import models, fields, api, tools, _
 
+from .library_perf_stat import instrumented
+
+
 class LibraryDashboard(models.Model):
     _name = 'library.dashboard'
     _description = 'Library Dashboard'
     _auto = False
+    _order = 'id'
+
+    period = fields.Selection([
+        ('all', 'All Time'),
+        ('today', 'Today'),
+        ('week', 'This Week'),
+        ('month', 'This Month'),
+    ], string='Period', readonly=True)
+    date_from = fields.Date(string='From Date', readonly=True)
+    refreshed_at = fields.Datetime(string='Last Refresh', readonly=True)
 
     total_books = fields.Integer(string='Total Books')
     available_books = fields.Integer(string='Available Books')
@@ -12,20 +25,151 @@ class LibraryDashboard(models.Model):
     active_borrowings = fields.Integer(string='Active Borrowings')
     overdue_borrowings = fields.Integer(string='Overdue Borrowings')
 
+    # Activity within the period
+    new_members = fields.Integer(string='New Members')
+    new_borrowings = fields.Integer(string='New Borrowings')
+    returned_borrowings = fields.Integer(string='Returned Borrowings')
+
+    _state_table = 'library_dashboard_state'
+    _watched_tables = ['library_book', 'library_member', 'library_borrowing']
+
     def init(self):
-        tools.drop_view_if_exists(self.env.cr, self._table)
-        self.env.cr.execute("""
-            CREATE OR REPLACE VIEW library_dashboard AS (
-                SELECT 
-                    row_number() OVER () as id,
-                    (SELECT COUNT(*) FROM library_book) as total_books,
-                    (SELECT COUNT(*) FROM library_book WHERE status = 'available') as available_books,
-                    (SELECT COUNT(*) FROM library_book WHERE status = 'checked_out') as borrowed_books,
-                    (SELECT COUNT(*) FROM library_member) as total_members,
-                    (SELECT COUNT(*) FROM library_borrowing WHERE returned = false) as active_borrowings,
-                    (SELECT COUNT(*) FROM library_borrowing WHERE returned = false AND due_date < CURRENT_DATE) as overdue_borrowings
+        cr = self.env.cr
+        cr.execute("SELECT relkind FROM pg_class WHERE relname = %s", [self._table])
+        row = cr.fetchone()
+        if row and row[0] == 'm':
+            cr.execute("DROP MATERIALIZED VIEW %s CASCADE" % self._table)
+        else:
+            tools.drop_view_if_exists(cr, self._table)
+
+        # One row per period, read in O(1) when the dashboard is opened.
+        # The counts are only recomputed by refresh_dashboard / the cron.
+        # Borrowing counts include the archived history.
+        cr.execute("""
+            CREATE MATERIALIZED VIEW library_dashboard AS (
+                WITH periods AS (
+                    SELECT * FROM (VALUES
+                        (1, 'all', NULL::date),
+                        (2, 'today', CURRENT_DATE),
+                        (3, 'week', date_trunc('week', CURRENT_DATE)::date),
+                        (4, 'month', date_trunc('month', CURRENT_DATE)::date)
+                    ) AS p (id, period, date_from)
+                ),
+                books AS (
+                    SELECT COUNT(*) AS total_books,
+                           COUNT(*) FILTER (WHERE status = 'available') AS available_books,
+                           COUNT(*) FILTER (WHERE status = 'checked_out') AS borrowed_books
+                      FROM library_book
+                )
+                SELECT
+                    p.id,
+                    p.period,
+                    p.date_from,
+                    now() AT TIME ZONE 'UTC' AS refreshed_at,
+                    b.total_books,
+                    b.available_books,
+                    b.borrowed_books,
+                    m.total_members,
+                    m.new_members,
+                    l.active_borrowings,
+                    l.overdue_borrowings,
+                    l.new_borrowings,
+                    l.returned_borrowings
+                FROM periods p
+                CROSS JOIN books b
+                CROSS JOIN LATERAL (
+                    SELECT COUNT(*) AS total_members,
+                           COUNT(*) FILTER (WHERE p.date_from IS NULL
+                                            OR created_date >= p.date_from) AS new_members
+                      FROM library_member
+                ) m
+                CROSS JOIN LATERAL (
+                    SELECT COUNT(*) FILTER (WHERE returned = false) AS active_borrowings,
+                           COUNT(*) FILTER (WHERE returned = false
+                                            AND due_date < CURRENT_DATE) AS overdue_borrowings,
+                           COUNT(*) FILTER (WHERE p.date_from IS NULL
+                                            OR borrow_date >= p.date_from) AS new_borrowings,
+                           COUNT(*) FILTER (WHERE returned = true
+                                            AND (p.date_from IS NULL
+                                                 OR return_date >= p.date_from)) AS returned_borrowings
+                      FROM library_borrowing_all
+                ) l
             )
         """)
+        # REFRESH ... CONCURRENTLY requires a unique index on the view
+        cr.execute("CREATE UNIQUE INDEX library_dashboard_id_uniq ON library_dashboard (id)")
+
+        cr.execute("""
+            CREATE TABLE IF NOT EXISTS library_dashboard_state (
+                id integer PRIMARY KEY,
+                dirty boolean NOT NULL DEFAULT false,
+                refreshed_at timestamp
+            )
+        """)
+        cr.execute("""
+            INSERT INTO library_dashboard_state (id, dirty, refreshed_at)
+            VALUES (1, false, now() AT TIME ZONE 'UTC')
+            ON CONFLICT (id) DO UPDATE SET dirty = false, refreshed_at = EXCLUDED.refreshed_at
+        """)
+        self._setup_delta_triggers()
+
+    def _delta_triggers_enabled(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        return tools.str2bool(ICP.get_param('library_manager.dashboard_delta_triggers', 'False'))
+
+    def _setup_delta_triggers(self):
+        """Install or drop the triggers flagging the dashboard as stale.
+
+        A materialized view cannot absorb row deltas, so the triggers only
+        mark it dirty; the cron then skips refreshes when nothing changed.
+        """
+        cr = self.env.cr
+        enabled = self._delta_triggers_enabled()
+        if enabled:
+            cr.execute("""
+                CREATE OR REPLACE FUNCTION library_dashboard_mark_dirty() RETURNS trigger AS $$
+                BEGIN
+                    UPDATE library_dashboard_state SET dirty = true WHERE id = 1 AND NOT dirty;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql
+            """)
+        for table in self._watched_tables:
+            cr.execute("DROP TRIGGER IF EXISTS library_dashboard_dirty ON %s" % table)
+            if enabled:
+                cr.execute("""
+                    CREATE TRIGGER library_dashboard_dirty
+                    AFTER INSERT OR UPDATE OR DELETE ON %s
+                    FOR EACH STATEMENT EXECUTE PROCEDURE library_dashboard_mark_dirty()
+                """ % table)
+
+    def _is_stale(self):
+        self.env.cr.execute("""
+            SELECT dirty OR refreshed_at IS NULL OR refreshed_at::date < CURRENT_DATE
+              FROM library_dashboard_state WHERE id = 1
+        """)
+        row = self.env.cr.fetchone()
+        return not row or row[0]
+
+    @api.model
+    @instrumented('dashboard.refresh')
+    def _refresh_materialized_view(self, concurrently=True):
+        """Recompute the dashboard rows without blocking readers."""
+        self.env.flush_all()
+        self.env.cr.execute("REFRESH MATERIALIZED VIEW %s %s" % (
+            'CONCURRENTLY' if concurrently else '', self._table))
+        self.env.cr.execute("""
+            UPDATE library_dashboard_state
+               SET dirty = false, refreshed_at = now() AT TIME ZONE 'UTC'
+             WHERE id = 1
+        """)
+        self.invalidate_model()
+
+    @api.model
+    def _cron_refresh_dashboard(self):
+        if self._delta_triggers_enabled() and not self._is_stale():
+            return
+        self._refresh_materialized_view()
 
     def action_open_books(self):
         return {
@@ -52,9 +196,9 @@ class LibraryDashboard(models.Model):
         }
 
     def refresh_dashboard(self):
-        """Refresh the dashboard by reloading the SQL view data"""
-        self.env.cr.execute("REFRESH MATERIALIZED VIEW IF EXISTS library_dashboard")
+        """Refresh the dashboard by recomputing the materialized view"""
+        self._refresh_materialized_view()
         return {
             'type': 'ir.actions.client',
             'tag': 'reload',
-        }
\ No newline at end of file
+        }
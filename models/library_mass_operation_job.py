@@ -0,0 +1,247 @@
+import io
+import itertools
+import logging
+import time
+
+from psycopg2.extensions import TransactionRollbackError
+
+from odoo import models, fields, api, _
+from odoo.exceptions import AccessError, UserError
+
+_logger = logging.getLogger(__name__)
+
+# Time a cron run may spend on jobs before handing over to a new run
+MAX_RUN_SECONDS = 120
+
+
+class LibraryMassOperationJob(models.Model):
+    _name = 'library.mass.operation.job'
+    _description = 'Library Mass Operation Job'
+    _inherit = ['mail.thread']
+    _order = 'id desc'
+
+    name = fields.Char(string='Name', required=True)
+    user_id = fields.Many2one('res.users', string='Requested By', default=lambda self: self.env.user, readonly=True)
+    operation_type = fields.Selection([
+        ('change_status', 'Change Book Status'),
+        ('update_rating', 'Update Book Rating'),
+        ('import_books', 'Import Books'),
+    ], string='Operation Type', required=True, readonly=True)
+    new_status = fields.Selection([
+        ('available', 'Available'),
+        ('checked_out', 'Checked Out'),
+        ('maintenance', 'Under Maintenance'),
+    ], string='New Status', readonly=True)
+    new_rating = fields.Selection([
+        ('1', '★☆☆☆☆'),
+        ('2', '★★☆☆☆'),
+        ('3', '★★★☆☆'),
+        ('4', '★★★★☆'),
+        ('5', '★★★★★'),
+    ], string='New Rating', readonly=True)
+    book_ids = fields.Many2many(
+        'library.book', 'library_mass_operation_job_book_rel', 'job_id', 'book_id',
+        string='Books', readonly=True)
+    chunk_size = fields.Integer(string='Chunk Size', default=1000)
+
+    # Book imports: the uploaded file and the load counters
+    attachment_id = fields.Many2one('ir.attachment', string='File', readonly=True, ondelete='set null')
+    import_format = fields.Selection([
+        ('csv', 'CSV'),
+        ('json', 'JSON Lines'),
+        ('marc', 'MARC (mnemonic)'),
+    ], string='Format', readonly=True)
+    import_default_price = fields.Float(string='Default Borrowing Price', readonly=True)
+    created_count = fields.Integer(string='Created', readonly=True)
+    updated_count = fields.Integer(string='Updated', readonly=True)
+    error_count = fields.Integer(string='Errors', readonly=True)
+    import_log = fields.Text(string='Import Log', readonly=True)
+
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ], string='Status', default='queued', required=True, readonly=True)
+    total_count = fields.Integer(string='Total Books', readonly=True)
+    processed_count = fields.Integer(string='Processed Books', readonly=True)
+    # Resume cursor: books are processed in id order
+    last_book_id = fields.Integer(string='Last Processed Book', readonly=True)
+    progress = fields.Float(string='Progress', compute='_compute_progress')
+    error_message = fields.Text(string='Error', readonly=True)
+
+    @api.depends('processed_count', 'total_count')
+    def _compute_progress(self):
+        for job in self:
+            job.progress = job.total_count and 100.0 * job.processed_count / job.total_count
+
+    def _trigger_processing(self):
+        self.env.ref('Library_Manager.ir_cron_process_mass_operation_jobs')._trigger()
+
+    def _check_requester(self):
+        """Library users may only cancel or resume the jobs they requested"""
+        if not self.env.user.has_group('base.group_system') and self.filtered(lambda job: job.user_id != self.env.user):
+            raise AccessError(_("You can only cancel or resume your own jobs."))
+
+    def action_cancel(self):
+        self._check_requester()
+        jobs = self.sudo().filtered(lambda job: job.state in ('queued', 'running', 'failed'))
+        jobs.write({'state': 'cancelled'})
+
+    def action_resume(self):
+        self._check_requester()
+        jobs = self.sudo().filtered(lambda job: job.state in ('failed', 'cancelled'))
+        if not jobs:
+            raise UserError(_("Only failed or cancelled jobs can be resumed."))
+        jobs.write({'state': 'queued', 'error_message': False})
+        jobs._trigger_processing()
+
+    def _get_next_chunk(self):
+        self.env.cr.execute("""
+            SELECT book_id
+              FROM library_mass_operation_job_book_rel
+             WHERE job_id = %s AND book_id > %s
+          ORDER BY book_id
+             LIMIT %s
+        """, [self.id, self.last_book_id, max(self.chunk_size, 1)])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _apply_chunk(self, books):
+        books = books._with_bulk_context()
+        if self.operation_type == 'change_status':
+            books.write({'status': self.new_status})
+            books._log_bulk_summary(_("Status changed to %s by a mass operation") %
+                                    dict(self._fields['new_status'].selection)[self.new_status], self)
+        elif self.operation_type == 'update_rating':
+            books.write({'rating': self.new_rating})
+            books._log_bulk_summary(_("Rating set to %s by a mass operation") % self.new_rating, self)
+
+    def _run(self, deadline):
+        """Process the job chunk by chunk, committing after each chunk.
+
+        Returns False when the deadline is reached before the job is over.
+        """
+        self.ensure_one()
+        if self.operation_type == 'import_books':
+            return self._run_import(deadline)
+        while time.monotonic() < deadline:
+            # Lock the job for the chunk; a cancellation waits for the commit
+            self.env.cr.execute("SELECT state FROM library_mass_operation_job WHERE id = %s FOR UPDATE", [self.id])
+            if self.env.cr.fetchone()[0] not in ('queued', 'running'):
+                self.env.cr.rollback()
+                return True
+            self.invalidate_recordset()
+            book_ids = self._get_next_chunk()
+            if not book_ids:
+                self.write({'state': 'done'})
+                self.env.cr.commit()
+                return True
+            self._apply_chunk(self.env['library.book'].browse(book_ids))
+            self.write({
+                'state': 'running',
+                'last_book_id': book_ids[-1],
+                'processed_count': self.processed_count + len(book_ids),
+            })
+            self.env.cr.commit()
+        return False
+
+    def _lock_active(self):
+        """Lock the job for a chunk; False if it was cancelled meanwhile"""
+        self.env.cr.execute("SELECT state FROM library_mass_operation_job WHERE id = %s FOR UPDATE", [self.id])
+        if self.env.cr.fetchone()[0] not in ('queued', 'running'):
+            self.env.cr.rollback()
+            return False
+        self.invalidate_recordset()
+        return True
+
+    def _run_import(self, deadline):
+        """Stream the file and upsert it chunk by chunk, committing each chunk.
+
+        ``processed_count`` is the number of file records already handled, so
+        a resumed or continued job skips them without loading them again.
+        """
+        importer = self.env['library.book.import.wizard']
+        parser = importer._get_parser(self.import_format)
+        default_price = self.import_default_price
+        self.env['library.book'].flush_model()
+        chunk, messages = [], []
+        errors = last_record = 0
+
+        if not self.total_count:
+            # Count the records once, for the progress of the job
+            with importer._open_attachment(self.attachment_id) as binary:
+                stream = io.TextIOWrapper(binary, encoding='utf-8-sig', errors='replace', newline='')
+                total = sum(1 for _record in parser(stream))
+            if not self._lock_active():
+                return True
+            self.write({'total_count': total})
+            self.env.cr.commit()
+
+        def commit_chunk():
+            if not self._lock_active():
+                return False
+            created, updated = importer._upsert_chunk(chunk) if chunk else (0, 0)
+            log = '\n'.join(filter(None, [self.import_log] + messages[:max(100 - self.error_count, 0)]))
+            self.write({
+                'state': 'running',
+                'processed_count': last_record,
+                'created_count': self.created_count + created,
+                'updated_count': self.updated_count + updated,
+                'error_count': self.error_count + errors,
+                'import_log': log or False,
+            })
+            self.env.cr.commit()
+            self.env['library.book'].invalidate_model()
+            return True
+
+        with importer._open_attachment(self.attachment_id) as binary:
+            stream = io.TextIOWrapper(binary, encoding='utf-8-sig', errors='replace', newline='')
+            records = enumerate(parser(stream), start=1)
+            for last_record, values in itertools.islice(records, self.processed_count, None):
+                try:
+                    if isinstance(values, ValueError):
+                        raise values
+                    chunk.append(importer._prepare_row(values, default_price))
+                except (ValueError, TypeError) as e:
+                    errors += 1
+                    messages.append(_("Record %s: %s") % (last_record, e))
+                if len(chunk) + errors >= max(self.chunk_size, 1):
+                    if not commit_chunk():
+                        return True
+                    chunk, messages = [], []
+                    errors = 0
+                    if time.monotonic() >= deadline:
+                        return False
+            if (chunk or errors) and not commit_chunk():
+                return True
+
+        if not self._lock_active():
+            return True
+        self.write({'state': 'done'})
+        self.env.cr.commit()
+        return True
+
+    @api.model
+    def _cron_process_jobs(self):
+        deadline = time.monotonic() + MAX_RUN_SECONDS
+        for job in self.search([('state', 'in', ('queued', 'running'))], order='id'):
+            while True:
+                try:
+                    finished = job._run(deadline)
+                except TransactionRollbackError:
+                    # Concurrent update of the job (e.g. a cancellation): retry the chunk
+                    self.env.cr.rollback()
+                    self.env.invalidate_all(flush=False)
+                    continue
+                except Exception as e:
+                    self.env.cr.rollback()
+                    self.env.invalidate_all(flush=False)
+                    _logger.exception("Mass operation job %s failed", job.id)
+                    job.write({'state': 'failed', 'error_message': str(e)})
+                    self.env.cr.commit()
+                    finished = True
+                break
+            if not finished:
+                self._trigger_processing()
+                return
@@ -1,73 +1,103 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
 from datetime import timedelta
 
+from .library_perf_stat import instrumented
+
 class LibraryMember(models.Model):
     _name = 'library.member'
     _description = 'Library Member'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'library.bulk.mixin']
 
     name = fields.Char(string='Full Name', required=True, tracking=True)
     email = fields.Char(string='Email', tracking=True)
     phone = fields.Char(string='Phone', tracking=True)
+    barcode = fields.Char(string='Card Number', copy=False, index=True)
     created_date = fields.Date(string='Created Date', default=fields.Date.today)
 
     # Relations
     borrowing_ids = fields.One2many('library.borrowing', 'member_id', string='Borrowings')
 
     # Computed fields
-    active_borrowings_count = fields.Integer(string='Active Borrowings', compute='_compute_active_borrowings')
-    total_borrowings_count = fields.Integer(string='Total Borrowings', compute='_compute_total_borrowings')
+    active_borrowings_count = fields.Integer(string='Active Borrowings', compute='_compute_borrowings_count', store=True, index=True)
+    total_borrowings_count = fields.Integer(string='Total Borrowings', compute='_compute_borrowings_count', store=True, index=True)
     user_id = fields.Many2one('res.users', string="Related User", required=True)
 
      # الربط مع الـ Expense Tracker
     budget_id = fields.Many2one('expense.budget', string='Expense Budget', ondelete='set null')
+
+    _sql_constraints = [
+        ('barcode_unique', 'unique(barcode)', 'The card number must be unique!'),
+    ]
     
+    @api.model_create_multi
+    def create(self, vals_list):
+        # إنشاء الـ budgets للدفعة كاملة قبل إنشاء الأعضاء
+        if not self._is_lazy_budget():
+            to_provision = [vals for vals in vals_list if not vals.get('budget_id')]
+            if to_provision:
+                budgets = self._create_budgets([vals.get('name') for vals in to_provision])
+                for vals, budget in zip(to_provision, budgets):
+                    vals['budget_id'] = budget.id
+
+        # إنشاء الأعضاء
+        return super(LibraryMember, self).create(vals_list)
+
     @api.model
-    def create(self, vals):
-        # إنشاء العضو
-        member = super(LibraryMember, self).create(vals)
+    def _is_lazy_budget(self):
+        """Whether budgets are provisioned on first checkout instead of on creation"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return tools.str2bool(ICP.get_param('library_manager.lazy_budget', 'False'))
 
-            # البحث عن أول category متاحة أو إنشاء واحدة
+    @api.model
+    def _create_budgets(self, member_names):
+        """Create one expense budget per member name, in a single call"""
+        # البحث عن أول category متاحة أو إنشاء واحدة
         category = self.env['expense.category'].search([], limit=1)
         if not category:
             category = self.env['expense.category'].create({
                 'name': 'Books',
                 'code': 'BOOKS'
             })
-        
-        # إنشاء budget جديد في expense tracker لهذا العضو
-        budget = self.env['expense.budget'].create({
-        'name': 'Book Budget - {}'.format(member.name),
-        'category_id': category.id,
-        'amount': 500.0,
-        'period_type': 'monthly',
-        'date_from': fields.Date.today(),
-        'date_to': fields.Date.today() + timedelta(days=30),
-        'state': 'active',
-        })
-
-        member.budget_id = budget.id
-        return member
 
-    @api.depends('borrowing_ids.returned')
-    def _compute_active_borrowings(self):
-        for member in self:
-            member.active_borrowings_count = self.env['library.borrowing'].search_count([
-                ('member_id', '=', member.id),
-                ('returned', '=', False)
-            ])
+        # إنشاء budget جديد في expense tracker لكل عضو
+        today = fields.Date.today()
+        return self.env['expense.budget'].create([{
+            'name': 'Book Budget - {}'.format(name),
+            'category_id': category.id,
+            'amount': 500.0,
+            'period_type': 'monthly',
+            'date_from': today,
+            'date_to': today + timedelta(days=30),
+            'state': 'active',
+        } for name in member_names])
 
-    @api.depends('borrowing_ids')
-    def _compute_total_borrowings(self):
-        for member in self:
-            member.total_borrowings_count = len(member.borrowing_ids)
+    def _provision_budgets(self):
+        """Give a budget to the members that have none yet (lazy mode)"""
+        members = self.filtered(lambda member: not member.budget_id)
+        if members:
+            budgets = self._create_budgets(members.mapped('name'))
+            for member, budget in zip(members, budgets):
+                member.budget_id = budget
 
-    @api.depends('borrowing_ids')
+    @api.depends('borrowing_ids', 'borrowing_ids.returned')
+    @instrumented('member.compute_borrowings_count')
     def _compute_borrowings_count(self):
-        for rec in self:
-            rec.active_borrowings_count = len(rec.borrowing_ids.filtered(lambda b: not b.returned))
-            rec.total_borrowings_count = len(rec.borrowing_ids)
+        # One grouped query for the whole recordset; stored so the most
+        # active members can be sorted and filtered in SQL.
+        counts = {}
+        member_ids = [member_id for member_id in self._origin.ids if member_id]
+        if member_ids:
+            self.env['library.borrowing'].flush_model(['member_id', 'returned'])
+            self.env.cr.execute("""
+                SELECT member_id, COUNT(*) FILTER (WHERE NOT returned), COUNT(*)
+                  FROM library_borrowing_all
+                 WHERE member_id IN %s
+              GROUP BY member_id
+            """, [tuple(member_ids)])
+            counts = {member_id: (active, total) for member_id, active, total in self.env.cr.fetchall()}
+        for member in self:
+            member.active_borrowings_count, member.total_borrowings_count = counts.get(member._origin.id, (0, 0))
 
     def action_view_borrowings(self):
         self.ensure_one()
@@ -78,4 +108,15 @@ class LibraryMember(models.Model):
             'domain': [('member_id', '=', self.id)],
             'view_mode': 'tree,form',
             'context': {'default_member_id': self.id}
-        }
\ No newline at end of file
+        }
+
+    def action_view_borrowing_history(self):
+        """Show the complete borrowing history, archived included"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Borrowing History - {}'.format(self.name),
+            'res_model': 'library.borrowing.all',
+            'domain': [('member_id', '=', self.id)],
+            'view_mode': 'tree,pivot,graph',
+        }
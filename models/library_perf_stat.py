@@ -0,0 +1,180 @@
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.http import request
+
+_logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 60
+DEFAULT_SLOW_MS = 1000
+
+# Counters of this worker, keyed by database and operation, added to the
+# library_perf_stat table at most once per FLUSH_INTERVAL seconds so the
+# hot paths never write to the database themselves.
+_buffer = {}
+_last_flush = {}
+_lock = threading.Lock()
+
+
+class OperationStats:
+    """Measurements of one instrumented operation"""
+    __slots__ = ('operation', 'rows', 'queries', 'sql_time', 'python_time')
+
+    def __init__(self, operation, rows=0):
+        self.operation = operation
+        self.rows = rows
+        self.queries = 0
+        self.sql_time = 0.0
+        self.python_time = 0.0
+
+
+@contextmanager
+def measure_operation(env, operation, rows=0):
+    """Measure the block as ``operation``: query count, SQL and Python time.
+
+    Set ``rows`` on the yielded stats to record how many rows the operation
+    handled. Nested operations are measured independently.
+    """
+    thread = threading.current_thread()
+    # The cursors count the queries of the thread in these attributes, the
+    # HTTP and cron threads reset them at the start of each request/job.
+    if not hasattr(thread, 'query_count'):
+        thread.query_count = 0
+        thread.query_time = 0
+    stats = OperationStats(operation, rows)
+    query_count, query_time = thread.query_count, thread.query_time
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.queries = thread.query_count - query_count
+        stats.sql_time = thread.query_time - query_time
+        stats.python_time = max(elapsed - stats.sql_time, 0.0)
+        _record(env, stats, elapsed)
+
+
+def instrumented(operation):
+    """Decorator measuring a model method or a controller route.
+
+    Rows are the records returned by the method, or else the records it was
+    called on. For routes, the environment of the current request is used.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            env = self.env if isinstance(self, models.BaseModel) else request.env
+            with measure_operation(env, operation) as stats:
+                result = method(self, *args, **kwargs)
+                if isinstance(result, models.BaseModel):
+                    stats.rows = len(result)
+                elif isinstance(self, models.BaseModel):
+                    stats.rows = len(self)
+                return result
+        return wrapper
+    return decorator
+
+
+def _record(env, stats, elapsed):
+    dbname = env.cr.dbname
+    with _lock:
+        counters = _buffer.setdefault(dbname, {}).setdefault(stats.operation, [0, 0, 0.0, 0.0, 0, 0.0])
+        counters[0] += 1
+        counters[1] += stats.queries
+        counters[2] += stats.sql_time
+        counters[3] += stats.python_time
+        counters[4] += stats.rows
+        counters[5] = max(counters[5], elapsed)
+        last_flush = _last_flush.setdefault(dbname, time.monotonic())
+
+    slow_ms = int(env['ir.config_parameter'].sudo().get_param(
+        'library_manager.slow_operation_ms', DEFAULT_SLOW_MS) or 0)
+    if slow_ms and elapsed * 1000 >= slow_ms:
+        _logger.warning("Slow library operation: %s", json.dumps({
+            'operation': stats.operation,
+            'db': dbname,
+            'uid': env.uid,
+            'duration_ms': round(elapsed * 1000, 1),
+            'queries': stats.queries,
+            'sql_ms': round(stats.sql_time * 1000, 1),
+            'python_ms': round(stats.python_time * 1000, 1),
+            'rows': stats.rows,
+        }))
+
+    if time.monotonic() - last_flush >= FLUSH_INTERVAL:
+        env['library.perf.stat']._flush_buffer()
+
+
+class LibraryPerfStat(models.Model):
+    _name = 'library.perf.stat'
+    _description = 'Library Operation Statistics'
+    _order = 'bucket desc, operation'
+    _log_access = False
+
+    operation = fields.Char(string='Operation', required=True, index=True, readonly=True)
+    bucket = fields.Datetime(string='Minute', required=True, index=True, readonly=True)
+    calls = fields.Integer(string='Calls', readonly=True)
+    queries = fields.Integer(string='Queries', readonly=True)
+    sql_time = fields.Float(string='SQL Time (s)', digits=(16, 4), readonly=True)
+    python_time = fields.Float(string='Python Time (s)', digits=(16, 4), readonly=True)
+    row_count = fields.Integer(string='Rows', readonly=True)
+    max_time = fields.Float(string='Slowest Call (s)', digits=(16, 4), group_operator='max', readonly=True)
+
+    _sql_constraints = [
+        ('operation_bucket_unique', 'unique(operation, bucket)', 'One statistics row per operation and minute.'),
+    ]
+
+    @api.model
+    def _flush_buffer(self):
+        """Add the counters of this worker to the current minute's rows"""
+        dbname = self.env.cr.dbname
+        with _lock:
+            counters = _buffer.pop(dbname, {})
+            _last_flush[dbname] = time.monotonic()
+        if not counters:
+            return
+        # Own cursor: the statistics must survive a rollback of the
+        # operation's transaction and must not lock its rows.
+        try:
+            with self.env.registry.cursor() as cr:
+                for operation, (calls, queries, sql_time, python_time, rows, max_time) in counters.items():
+                    cr.execute("""
+                        INSERT INTO library_perf_stat
+                               (operation, bucket, calls, queries, sql_time, python_time, row_count, max_time)
+                        VALUES (%s, date_trunc('minute', now() AT TIME ZONE 'UTC'), %s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (operation, bucket) DO UPDATE
+                           SET calls = library_perf_stat.calls + EXCLUDED.calls,
+                               queries = library_perf_stat.queries + EXCLUDED.queries,
+                               sql_time = library_perf_stat.sql_time + EXCLUDED.sql_time,
+                               python_time = library_perf_stat.python_time + EXCLUDED.python_time,
+                               row_count = library_perf_stat.row_count + EXCLUDED.row_count,
+                               max_time = GREATEST(library_perf_stat.max_time, EXCLUDED.max_time)
+                    """, [operation, calls, queries, sql_time, python_time, rows, max_time])
+        except Exception:
+            _logger.warning("Could not save the library operation statistics", exc_info=True)
+
+    @api.model
+    def _get_window_stats(self, minutes=5):
+        """Totals per operation over the last ``minutes`` minutes"""
+        self.env.cr.execute("""
+            SELECT operation, SUM(calls), SUM(queries), SUM(sql_time), SUM(python_time),
+                   SUM(row_count), MAX(max_time)
+              FROM library_perf_stat
+             WHERE bucket >= date_trunc('minute', now() AT TIME ZONE 'UTC') - make_interval(mins => %s)
+          GROUP BY operation
+          ORDER BY operation
+        """, [minutes])
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _cron_purge_stats(self):
+        self._flush_buffer()
+        hours = int(self.env['ir.config_parameter'].sudo().get_param('library_manager.perf_retention_hours', 24) or 24)
+        self.env.cr.execute("DELETE FROM library_perf_stat WHERE bucket < %s",
+                            [fields.Datetime.now() - timedelta(hours=hours)])
@@ -0,0 +1,132 @@
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+# Members rendered and queued per batch
+REMINDER_BATCH_SIZE = 500
+
+
+class LibraryReminderLog(models.Model):
+    _name = 'library.reminder.log'
+    _description = 'Library Reminder Log'
+    _order = 'id desc'
+
+    borrowing_id = fields.Many2one('library.borrowing', string='Borrowing', required=True, ondelete='cascade')
+    member_id = fields.Many2one('library.member', string='Member', required=True, ondelete='cascade', index=True)
+    reminder_type = fields.Selection([
+        ('due_today', 'Due Today'),
+        ('due_soon', 'Due in 3 Days'),
+        ('overdue', 'Overdue'),
+    ], string='Reminder Type', required=True)
+    due_date = fields.Date(string='Due Date', required=True)
+    mail_id = fields.Many2one('mail.mail', string='Mail', ondelete='set null')
+
+    # One reminder of each type per loan and due date
+    _sql_constraints = [
+        ('reminder_unique', 'unique(borrowing_id, reminder_type, due_date)',
+         'This reminder has already been sent.'),
+    ]
+
+    @api.model
+    def _get_pending_reminders(self, reminder_type, members=None):
+        """Return {member id: [borrowing ids]} for the reminders left to send.
+
+        Open loans are selected through the partial due_date index and the
+        ones already reminded for this due date are skipped.
+        """
+        today = fields.Date.today()
+        conditions = {
+            'due_today': ('b.due_date = %s', [today]),
+            'due_soon': ('b.due_date > %s AND b.due_date <= %s', [today, today + timedelta(days=3)]),
+            'overdue': ('b.due_date < %s', [today]),
+        }
+        condition, params = conditions[reminder_type]
+        if members:
+            condition += ' AND b.member_id IN %s'
+            params.append(tuple(members.ids))
+        self.env['library.borrowing'].flush_model(['member_id', 'due_date', 'returned'])
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT b.member_id, b.id
+              FROM library_borrowing b
+             WHERE b.returned = false AND {condition}
+               AND NOT EXISTS (
+                    SELECT 1 FROM library_reminder_log l
+                     WHERE l.borrowing_id = b.id
+                       AND l.reminder_type = %s
+                       AND l.due_date = b.due_date
+               )
+          ORDER BY b.member_id, b.due_date, b.id
+        """.format(condition=condition), params + [reminder_type])
+        pending = {}
+        for member_id, borrowing_id in self.env.cr.fetchall():
+            pending.setdefault(member_id, []).append(borrowing_id)
+        return pending
+
+    @api.model
+    def _send_reminders(self, reminder_type, members=None):
+        """Queue one reminder mail per member listing all their books.
+
+        Mails are rendered and created per batch of members; returns the
+        number of members and borrowings reminded.
+        """
+        template = self.env.ref('Library_Manager.mail_template_borrowing_reminder')
+        title = dict(self._fields['reminder_type'].selection)[reminder_type]
+        pending = self._get_pending_reminders(reminder_type, members)
+        Member = self.env['library.member']
+        Borrowing = self.env['library.borrowing']
+        email_from = self.env.company.email_formatted or self.env.user.email_formatted
+        member_count = borrowing_count = 0
+
+        for member_ids in split_every(REMINDER_BATCH_SIZE, list(pending)):
+            batch_members = Member.browse(member_ids).filtered('email')
+            if not batch_members:
+                continue
+            # Browse the whole batch at once so books are fetched in one go
+            borrowings = Borrowing.browse([
+                borrowing_id for member_id in batch_members.ids for borrowing_id in pending[member_id]])
+            lines = {}
+            for member in batch_members:
+                lines[member.id] = [{
+                    'book': borrowing.book_id.name,
+                    'author': borrowing.book_id.author,
+                    'due_date': borrowing.due_date,
+                    'days_overdue': borrowing.days_overdue,
+                } for borrowing in Borrowing.browse(pending[member.id]).with_prefetch(borrowings._prefetch_ids)]
+
+            render_context = {'reminder_title': title, 'reminder_lines': lines}
+            subjects = template._render_field('subject', batch_members.ids, add_context=render_context)
+            bodies = template._render_field('body_html', batch_members.ids, add_context=render_context)
+            mails = self.env['mail.mail'].sudo().create([{
+                'subject': subjects[member.id],
+                'body_html': bodies[member.id],
+                'email_from': email_from,
+                'email_to': member.email,
+                'model': 'library.member',
+                'res_id': member.id,
+                'auto_delete': True,
+            } for member in batch_members])
+
+            self.create([{
+                'borrowing_id': borrowing_id,
+                'member_id': member.id,
+                'reminder_type': reminder_type,
+                'due_date': borrowing['due_date'],
+                'mail_id': mail.id,
+            } for member, mail in zip(batch_members, mails)
+                for borrowing_id, borrowing in zip(pending[member.id], lines[member.id])])
+
+            member_count += len(batch_members)
+            borrowing_count += sum(len(lines[member_id]) for member_id in batch_members.ids)
+            _logger.info("Library reminders (%s): %s members queued", reminder_type, member_count)
+
+        return member_count, borrowing_count
+
+    @api.model
+    def _cron_send_reminders(self):
+        for reminder_type in ('due_soon', 'due_today', 'overdue'):
+            self._send_reminders(reminder_type)
@@ -0,0 +1,180 @@
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError, ValidationError
+
+
+class LibraryReservation(models.Model):
+    _name = 'library.reservation'
+    _description = 'Book Reservation'
+    _order = 'book_id, priority desc, create_date, id'
+
+    book_id = fields.Many2one('library.book', string='Book', required=True, ondelete='cascade')
+    member_id = fields.Many2one('library.member', string='Member', required=True, ondelete='cascade', index=True)
+    priority = fields.Selection([
+        ('0', 'Normal'),
+        ('1', 'Urgent'),
+    ], string='Priority', default='0', required=True)
+    state = fields.Selection([
+        ('waiting', 'Waiting'),
+        ('fulfilled', 'Fulfilled'),
+        ('cancelled', 'Cancelled'),
+    ], string='Status', default='waiting', required=True)
+    queue_position = fields.Integer(string='Position in Queue', compute='_compute_queue_position')
+    borrowing_id = fields.Many2one('library.borrowing', string='Borrowing', readonly=True, ondelete='set null')
+    fulfilled_date = fields.Date(string='Fulfilled On', readonly=True)
+    note = fields.Char(string='Note', readonly=True)
+
+    _sql_constraints = [
+        ('waiting_unique', "EXCLUDE (book_id WITH =, member_id WITH =) WHERE (state = 'waiting')",
+         'This member is already waiting for this book.'),
+    ]
+
+    def init(self):
+        # The queue of a book, in dispatch order: its head is found with one
+        # index probe however long the queue is.
+        tools.create_index(self.env.cr, 'library_reservation_queue_index', self._table,
+                           ['book_id', 'priority DESC', 'create_date', 'id'], where="state = 'waiting'")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        books = self.env['library.book'].browse([vals['book_id'] for vals in vals_list if vals.get('book_id')])
+        availability = books._get_availability()
+        available = books.filtered(lambda book: availability.get(book.id))
+        if available:
+            raise ValidationError(_("These books are available, borrow them instead: %s")
+                                  % ', '.join(available.mapped('name')))
+        return super(LibraryReservation, self).create(vals_list)
+
+    def _compute_queue_position(self):
+        waiting = self.filtered(lambda reservation: reservation.state == 'waiting' and reservation._origin.id)
+        positions = {}
+        if waiting:
+            self.flush_model(['book_id', 'priority', 'state'])
+            self.env.cr.execute("""
+                SELECT id, position
+                  FROM (SELECT id, row_number() OVER (
+                                   PARTITION BY book_id ORDER BY priority DESC, create_date, id) AS position
+                          FROM library_reservation
+                         WHERE state = 'waiting' AND book_id IN %s) queue
+                 WHERE id IN %s
+            """, [tuple(set(waiting.book_id._origin.ids)), tuple(waiting._origin.ids)])
+            positions = dict(self.env.cr.fetchall())
+        for reservation in self:
+            reservation.queue_position = positions.get(reservation._origin.id, 0)
+
+    def name_get(self):
+        return [(reservation.id, "{} - {}".format(reservation.book_id.name, reservation.member_id.name))
+                for reservation in self]
+
+    def action_cancel(self):
+        self.filtered(lambda reservation: reservation.state == 'waiting').write({'state': 'cancelled'})
+
+    @api.model
+    def _dispatch(self, books):
+        """Hand each of the freed ``books`` to the head of its queue.
+
+        The next holders of all the books are picked with one query and
+        their borrowings are created in one batch. Holders who cannot borrow
+        (no budget left, ...) are cancelled and the next in line is tried.
+        Returns the fulfilled reservations.
+        """
+        fulfilled = self.browse()
+        book_ids = [book_id for book_id in books._origin.ids if book_id]
+        while book_ids:
+            heads = self._get_queue_heads(book_ids)
+            if not heads:
+                break
+            done, failed = heads._fulfill()
+            fulfilled |= done
+            book_ids = failed.book_id.ids
+        if fulfilled:
+            fulfilled._notify_holders()
+        return fulfilled
+
+    @api.model
+    def _get_queue_heads(self, book_ids):
+        """First waiting reservation of each book, locked for the dispatch.
+
+        Books still on an open loan are left alone: their queue is served
+        when the loan is returned. A head being edited by another
+        transaction is waited for, never skipped, so a book cannot go to
+        the next in line out of order.
+        """
+        self.flush_model(['book_id', 'priority', 'state'])
+        self.env['library.borrowing'].flush_model(['book_id', 'returned'])
+        self.env.cr.execute("""
+            SELECT head.id
+              FROM (SELECT book_id
+                      FROM unnest(%s::int[]) AS ids (book_id)
+                     WHERE NOT EXISTS (SELECT 1
+                                         FROM library_borrowing loan
+                                        WHERE loan.book_id = ids.book_id AND loan.returned = false)
+                   ) freed
+        CROSS JOIN LATERAL (
+                SELECT id
+                  FROM library_reservation
+                 WHERE state = 'waiting' AND book_id = freed.book_id
+              ORDER BY priority DESC, create_date, id
+                 LIMIT 1
+                   FOR UPDATE
+            ) head
+        """, [list(book_ids)])
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _fulfill(self):
+        """Check the books out to their holders; returns (fulfilled, failed)"""
+        Borrowing = self.env['library.borrowing']._with_bulk_context()
+        today = fields.Date.today()
+
+        def borrowing_vals(reservation):
+            return {
+                'member_id': reservation.member_id.id,
+                'book_id': reservation.book_id.id,
+                'borrow_date': today,
+                'notes': _("Reserved on %s") % fields.Date.to_date(reservation.create_date),
+            }
+
+        try:
+            with self.env.cr.savepoint():
+                borrowings = Borrowing.create([borrowing_vals(reservation) for reservation in self])
+        except UserError:
+            if len(self) == 1:
+                if self._is_book_on_loan():
+                    # Not the holder's fault: keep the place in the queue
+                    return self.browse(), self.browse()
+                fulfilled, failed = self.browse(), self
+            else:
+                # One of the holders cannot borrow: find out which, one by one
+                fulfilled = failed = self.browse()
+                for reservation in self:
+                    done, not_done = reservation._fulfill()
+                    fulfilled |= done
+                    failed |= not_done
+                return fulfilled, failed
+            failed.write({'state': 'cancelled', 'note': _("Could not be checked out when the book was returned.")})
+            return fulfilled, failed
+
+        for reservation, borrowing in zip(self, borrowings):
+            reservation.write({'state': 'fulfilled', 'borrowing_id': borrowing.id, 'fulfilled_date': today})
+        self.book_id._with_bulk_context()._log_bulk_summary(
+            _("Checked out from the reservation queue"), {reservation.book_id: reservation.member_id
+                                                          for reservation in self}.get)
+        return self, self.browse()
+
+    def _is_book_on_loan(self):
+        return bool(self.env['library.borrowing'].search_count([
+            ('book_id', '=', self.book_id.id),
+            ('returned', '=', False),
+        ], limit=1))
+
+    def _notify_holders(self):
+        """Push a notification to the holders instead of having them poll"""
+        notifications = [
+            (reservation.member_id.user_id.partner_id, 'simple_notification', {
+                'title': _("Reserved book checked out"),
+                'message': _('"%s" is now checked out to %s.') % (reservation.book_id.name, reservation.member_id.name),
+                'sticky': True,
+            })
+            for reservation in self if reservation.member_id.user_id
+        ]
+        if notifications:
+            self.env['bus.bus']._sendmany(notifications)
@@ -0,0 +1,26 @@
+from odoo import models, fields
+
+
+class ResConfigSettings(models.TransientModel):
+    _inherit = 'res.config.settings'
+
+    library_bulk_tracking = fields.Selection([
+        ('track', 'Track every change'),
+        ('summary', 'Log one summary note per operation'),
+        ('record', 'Log one note per record'),
+        ('skip', 'Skip tracking'),
+    ], string='Bulk Operations Tracking', default='summary',
+        config_parameter='library_manager.bulk_tracking',
+        help="How mail tracking is handled by bulk wizards, scheduled jobs and imports.")
+    library_lazy_budget = fields.Boolean(
+        string='Provision Budgets on First Checkout',
+        config_parameter='library_manager.lazy_budget',
+        help="Create the member's expense budget on their first checkout instead of when the member is created.")
+    library_archive_months = fields.Integer(
+        string='Archive Returned Borrowings After (Months)', default=12,
+        config_parameter='library_manager.archive_months',
+        help="Returned borrowings older than this are moved to the history table.")
+    library_slow_operation_ms = fields.Integer(
+        string='Slow Operation Threshold (ms)', default=1000,
+        config_parameter='library_manager.slow_operation_ms',
+        help="Instrumented operations taking longer than this are logged as slow operations.")
@@ -2,4 +2,5 @@ from . import book_borrow_wizard
 from . import book_return_wizard
 from . import library_report_wizard
 from . import mass_operation_wizard
-from . import quick_borrow_wizard
\ No newline at end of file
+from . import quick_borrow_wizard
+from . import book_import_wizard
\ No newline at end of file
@@ -1,5 +1,7 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+
+from ..library_perf_stat import instrumented
 # from datetime import timedelta , date
 
 
@@ -27,6 +29,7 @@ class BookBorrowWizard(models.TransientModel):
     #         borrow_date = fields.Date.from_string(self.borrow_date)
     #         self.due_date = borrow_date + timedelta(days=14)
 
+    @instrumented('wizard.borrow')
     def action_borrow_books(self):
         """Create borrowing records for selected books"""
         self.ensure_one()
@@ -35,24 +38,24 @@ class BookBorrowWizard(models.TransientModel):
             raise ValidationError(_("Please select at least one book to borrow."))
 
         # Check book availability
-        unavailable_books = self.book_ids.filtered(lambda b: b.status != 'available')
+        availability = self.book_ids._get_availability()
+        unavailable_books = self.book_ids.filtered(lambda b: not availability[b.id])
         if unavailable_books:
             raise ValidationError(_(
                 "The following books are not available: %s") %
                                   ', '.join(unavailable_books.mapped('name'))
                                   )
 
-        # Create borrowing records
-        Borrowing = self.env['library.borrowing']
-        for book in self.book_ids:
-            borrowing_vals = {
-                'member_id': self.member_id.id,
-                'book_id': book.id,
-                'borrow_date': self.borrow_date,
-                'due_date': self.due_date,
-                'notes': self.notes,
-            }
-            Borrowing.create(borrowing_vals)
+        # Create borrowing records in a single batch
+        self.env['library.borrowing']._with_bulk_context().create([{
+            'member_id': self.member_id.id,
+            'book_id': book.id,
+            'borrow_date': self.borrow_date,
+            'due_date': self.due_date,
+            'notes': self.notes,
+        } for book in self.book_ids])
+        self.book_ids._with_bulk_context()._log_bulk_summary(
+            _("Checked out by %s until %s") % (self.member_id.name, self.due_date), self.member_id)
 
         # Show success message
         book_names = ', '.join(self.book_ids.mapped('name'))
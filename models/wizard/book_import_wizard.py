@@ -0,0 +1,231 @@
+import base64
+import csv
+import io
+import json
+import re
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+from ..library_book import normalize_isbn
+
+# Columns accepted in CSV/JSON files, with their aliases
+IMPORT_COLUMNS = {
+    'name': 'name',
+    'title': 'name',
+    'author': 'author',
+    'isbn': 'isbn',
+    'publisher': 'publisher',
+    'publication_year': 'publication_year',
+    'year': 'publication_year',
+    'edition': 'edition',
+    'pages': 'pages',
+    'language': 'language',
+    'borrow_price': 'borrow_price',
+    'price': 'borrow_price',
+}
+
+# MARC 041$a language codes
+MARC_LANGUAGES = {'ara': 'ar', 'eng': 'en', 'fre': 'fr', 'fra': 'fr', 'spa': 'es'}
+
+# MARC tag/subfield -> book column, for mnemonic (.mrk) records
+MARC_FIELDS = {
+    ('020', 'a'): 'isbn',
+    ('041', 'a'): 'language',
+    ('100', 'a'): 'author',
+    ('110', 'a'): 'author',
+    ('245', 'a'): 'name',
+    ('250', 'a'): 'edition',
+    ('260', 'b'): 'publisher',
+    ('260', 'c'): 'publication_year',
+    ('264', 'b'): 'publisher',
+    ('264', 'c'): 'publication_year',
+    ('300', 'a'): 'pages',
+}
+
+
+class BookImportWizard(models.TransientModel):
+    _name = 'library.book.import.wizard'
+    _description = 'Book Catalog Import Wizard'
+
+    file = fields.Binary(string='File', required=True)
+    filename = fields.Char(string='File Name')
+    file_format = fields.Selection([
+        ('csv', 'CSV'),
+        ('json', 'JSON Lines'),
+        ('marc', 'MARC (mnemonic)'),
+    ], string='Format', required=True, default='csv')
+    chunk_size = fields.Integer(string='Chunk Size', default=1000)
+    default_price = fields.Float(string='Default Borrowing Price', default=0.0)
+
+    @api.model
+    def _open_attachment(self, attachment):
+        """Return a binary stream on ``attachment``, read from the filestore when possible"""
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw or b'')
+
+    @api.model
+    def _get_parser(self, file_format):
+        return {'csv': self._read_csv, 'json': self._read_json, 'marc': self._read_marc}[file_format]
+
+    # Parsers: each one yields dicts of raw column values, one per book, or
+    # the ValueError of a record that cannot be parsed, so that the import
+    # counts it and goes on with the next one.
+
+    def _read_csv(self, stream):
+        reader = csv.DictReader(stream)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield ValueError(_("Malformed CSV line %s: %s") % (reader.line_num, e))
+                continue
+            yield {IMPORT_COLUMNS[key.strip().lower()]: value
+                   for key, value in row.items() if key and key.strip().lower() in IMPORT_COLUMNS}
+
+    def _read_json(self, stream):
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield ValueError(_("Invalid JSON: %s") % e)
+                continue
+            if not isinstance(record, dict):
+                yield ValueError(_("Expected a JSON object, got %s.") % type(record).__name__)
+                continue
+            yield {IMPORT_COLUMNS[key.lower()]: value
+                   for key, value in record.items() if key.lower() in IMPORT_COLUMNS}
+
+    def _read_marc(self, stream):
+        record = {}
+        for line in stream:
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith('=LDR'):
+                if record:
+                    yield record
+                record = {}
+                continue
+            match = re.match(r'^=(\d{3})  (.*)$', line)
+            if not match:
+                continue
+            tag, data = match.groups()
+            for subfield in data.split('$')[1:]:
+                column = MARC_FIELDS.get((tag, subfield[:1]))
+                if column and column not in record:
+                    record[column] = subfield[1:].strip(' /:;,.')
+        if record:
+            yield record
+
+    @api.model
+    def _prepare_row(self, values, default_price=0.0):
+        """Validate raw values; return the column tuple to upsert"""
+        # JSON values may be numbers, booleans, ...: work on their text
+        values = {key: str(value).strip() for key, value in values.items()
+                  if value is not None and value is not False}
+        name = values.get('name', '')
+        author = values.get('author', '')
+        if not name or not author:
+            raise ValueError(_("Title and author are required."))
+        isbn = normalize_isbn(values.get('isbn'))
+        if values.get('isbn') and not isbn:
+            raise ValueError(_("Invalid ISBN '%s'.") % values['isbn'])
+        language = values.get('language', '').lower()
+        language = MARC_LANGUAGES.get(language, language)
+        if language not in ('ar', 'en', 'fr', 'es'):
+            language = 'ar'
+        year = re.search(r'\d{4}', str(values.get('publication_year') or ''))
+        pages = re.search(r'\d+', str(values.get('pages') or ''))
+        price = values.get('borrow_price')
+        return (
+            name,
+            author,
+            values.get('isbn') or None,
+            isbn or None,
+            values.get('publisher') or None,
+            int(year.group()) if year else None,
+            values.get('edition') or None,
+            int(pages.group()) if pages else None,
+            language,
+            float(price) if price else default_price,
+        )
+
+    @api.model
+    def _upsert_chunk(self, rows):
+        """Insert or update a chunk of books keyed on their normalized ISBN.
+
+        Rows go straight to SQL, so no mail tracking or chatter message is
+        generated for the load. Returns (created, updated).
+        """
+        # A row cannot be upserted twice in one statement: keep the last one per ISBN
+        unique_rows = {}
+        for index, row in enumerate(rows):
+            unique_rows[row[3] or ('row', index)] = row
+        self.env.cr.execute("""
+            INSERT INTO library_book (
+                name, author, isbn, isbn_normalized, publisher, publication_year,
+                edition, pages, language, borrow_price,
+                status, added_date, total_borrowings, popularity_score,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT v.name, v.author, v.isbn, v.isbn_normalized, v.publisher,
+                   v.publication_year::integer, v.edition, v.pages::integer,
+                   v.language, v.borrow_price::double precision,
+                   'available', CURRENT_DATE, 0, 0,
+                   %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+              FROM (VALUES {}) AS v (
+                   name, author, isbn, isbn_normalized, publisher, publication_year,
+                   edition, pages, language, borrow_price
+              )
+            ON CONFLICT (isbn_normalized) DO UPDATE SET
+                name = EXCLUDED.name,
+                author = EXCLUDED.author,
+                isbn = EXCLUDED.isbn,
+                publisher = COALESCE(EXCLUDED.publisher, library_book.publisher),
+                publication_year = COALESCE(EXCLUDED.publication_year, library_book.publication_year),
+                edition = COALESCE(EXCLUDED.edition, library_book.edition),
+                pages = COALESCE(EXCLUDED.pages, library_book.pages),
+                language = EXCLUDED.language,
+                borrow_price = EXCLUDED.borrow_price,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+            RETURNING (xmax = 0)
+        """.format(', '.join('%%(row%d)s' % index for index in range(len(unique_rows)))),
+            dict({'uid': self.env.uid}, **{'row%d' % index: row for index, row in enumerate(unique_rows.values())}))
+        inserted = [row[0] for row in self.env.cr.fetchall()]
+        return inserted.count(True), inserted.count(False)
+
+    def action_import(self):
+        """Hand the file over to a background job that loads it chunk by chunk"""
+        self.ensure_one()
+        if self.chunk_size < 1:
+            raise UserError(_("The chunk size must be positive."))
+        Job = self.env['library.mass.operation.job'].sudo().with_context(mail_create_nolog=True)
+        job = Job.create({
+            'name': _("Import %s") % (self.filename or _("Books")),
+            'user_id': self.env.user.id,
+            'operation_type': 'import_books',
+            'import_format': self.file_format,
+            'import_default_price': self.default_price,
+            'chunk_size': self.chunk_size,
+        })
+        job.attachment_id = self.env['ir.attachment'].sudo().create({
+            'name': self.filename or 'books.%s' % self.file_format,
+            'datas': self.file,
+            'res_model': job._name,
+            'res_id': job.id,
+        })
+        job._trigger_processing()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Import Job'),
+            'res_model': job._name,
+            'res_id': job.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
@@ -1,6 +1,8 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 
+from ..library_perf_stat import instrumented
+
 
 class BookReturnWizard(models.TransientModel):
     _name = 'library.book.return.wizard'
@@ -20,14 +22,8 @@ class BookReturnWizard(models.TransientModel):
     @api.depends('borrowing_ids', 'return_date')
     def _compute_fine_amount(self):
         for wizard in self:
-            total_fine = 0
-            for borrowing in wizard.borrowing_ids:
-                if borrowing.due_date and wizard.return_date:
-                    if wizard.return_date > borrowing.due_date:
-                        days_overdue = (wizard.return_date - borrowing.due_date).days
-                        # Fine calculation: 5 currency units per day
-                        total_fine += days_overdue * 5
-            wizard.fine_amount = total_fine
+            # Fine calculation: 5 currency units per day
+            wizard.fine_amount = wizard.borrowing_ids._get_overdue_days(wizard.return_date) * 5
 
     @api.onchange('member_id')
     def _onchange_member_id(self):
@@ -38,6 +34,7 @@ class BookReturnWizard(models.TransientModel):
             ])
             self.borrowing_ids = active_borrowings
 
+    @instrumented('wizard.return')
     def action_return_books(self):
         """Return selected books"""
         self.ensure_one()
@@ -45,16 +42,13 @@ class BookReturnWizard(models.TransientModel):
         if not self.borrowing_ids:
             raise ValidationError(_("Please select at least one book to return."))
 
-        returned_books = []
-        for borrowing in self.borrowing_ids:
-            borrowing.write({
-                'returned': True,
-                'return_date': self.return_date,
-            })
-            returned_books.append(borrowing.book_id.name)
+        returned = self.borrowing_ids._with_bulk_context()._return_books(self.return_date)
+        members = {borrowing.book_id: borrowing.member_id for borrowing in returned}
+        returned.book_id._with_bulk_context()._log_bulk_summary(
+            _("Returned on %s") % self.return_date, members.get)
 
         # Show success message
-        book_names = ', '.join(returned_books)
+        book_names = ', '.join(self.borrowing_ids.mapped('book_id.name'))
         message = _("Successfully returned: %s") % book_names
 
         if self.fine_amount > 0 and self.apply_fine:
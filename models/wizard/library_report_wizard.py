@@ -70,6 +70,11 @@ class LibraryReportWizard(models.TransientModel):
             'name': _('Book Popularity Report'),
             'res_model': 'library.book',
             'view_mode': 'tree,pivot,graph',
+            'views': [
+                (self.env.ref('Library_Manager.view_library_book_popularity_tree').id, 'tree'),
+                (False, 'pivot'),
+                (False, 'graph'),
+            ],
             'context': {
                 'search_default_top_borrowed': 1,
             }
@@ -82,6 +87,11 @@ class LibraryReportWizard(models.TransientModel):
             'name': _('Member Activity Report'),
             'res_model': 'library.member',
             'view_mode': 'tree,pivot,graph',
+            'views': [
+                (self.env.ref('Library_Manager.view_library_member_activity_tree').id, 'tree'),
+                (False, 'pivot'),
+                (False, 'graph'),
+            ],
             'context': {
                 'search_default_most_active': 1,
             }
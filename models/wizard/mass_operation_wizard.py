@@ -1,6 +1,11 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
-from datetime import timedelta
+
+from ..library_perf_stat import instrumented
+
+# Selections larger than this are processed by a background job
+BACKGROUND_THRESHOLD = 1000
+
 
 class MassOperationWizard(models.TransientModel):
     _name = 'library.mass.operation.wizard'
@@ -35,10 +40,14 @@ class MassOperationWizard(models.TransientModel):
     book_ids = fields.Many2many('library.book', string='Books')
     member_ids = fields.Many2many('library.member', string='Members')
 
+    @instrumented('wizard.mass_operation')
     def action_execute_operation(self):
         """Execute the selected mass operation"""
         self.ensure_one()
 
+        if self.operation_type in ('change_status', 'update_rating') and len(self.book_ids) > BACKGROUND_THRESHOLD:
+            return self._enqueue_job()
+
         operations = {
             'change_status': self._execute_change_status,
             'update_rating': self._execute_update_rating,
@@ -53,7 +62,11 @@ class MassOperationWizard(models.TransientModel):
             raise ValidationError(_("Please select a new status."))
 
         if self.book_ids:
-            self.book_ids.write({'status': self.new_status})
+            books = self.book_ids._with_bulk_context()
+            books.write({'status': self.new_status})
+            books._log_bulk_summary(_("Status changed to %s by a mass operation") %
+                                    dict(self._fields['new_status'].selection)[self.new_status],
+                                    self._create_job(state='done', processed_count=len(self.book_ids)))
             message = _("Status updated for %s books") % len(self.book_ids)
         else:
             message = _("No books selected")
@@ -66,7 +79,10 @@ class MassOperationWizard(models.TransientModel):
             raise ValidationError(_("Please select a new rating."))
 
         if self.book_ids:
-            self.book_ids.write({'rating': self.new_rating})
+            books = self.book_ids._with_bulk_context()
+            books.write({'rating': self.new_rating})
+            books._log_bulk_summary(_("Rating set to %s by a mass operation") % self.new_rating,
+                                    self._create_job(state='done', processed_count=len(self.book_ids)))
             message = _("Rating updated for %s books") % len(self.book_ids)
         else:
             message = _("No books selected")
@@ -75,23 +91,46 @@ class MassOperationWizard(models.TransientModel):
 
     def _execute_send_reminder(self):
         """Send due date reminders"""
-        today = fields.Date.today()
-        domain = [('returned', '=', False)]
+        if not self.reminder_type:
+            raise ValidationError(_("Please select a reminder type."))
 
-        if self.reminder_type == 'due_today':
-            domain.append(('due_date', '=', today))
-        elif self.reminder_type == 'due_soon':
-            domain.append(('due_date', '<=', today + timedelta(days=3)))
-            domain.append(('due_date', '>=', today))
-        elif self.reminder_type == 'overdue':
-            domain.append(('due_date', '<', today))
+        member_count, borrowing_count = self.env['library.reminder.log']._send_reminders(
+            self.reminder_type, self.member_ids or None)
+        message = _("Reminders queued for %s members (%s borrowings)") % (member_count, borrowing_count)
 
-        borrowings = self.env['library.borrowing'].search(domain)
+        return self._show_success_message(message)
 
-        # In a real scenario, you would send emails here
-        message = _("Reminders prepared for %s borrowings") % len(borrowings)
+    def _enqueue_job(self):
+        """Hand the operation over to a chunked background job"""
+        if self.operation_type == 'change_status' and not self.new_status:
+            raise ValidationError(_("Please select a new status."))
+        if self.operation_type == 'update_rating' and not self.new_rating:
+            raise ValidationError(_("Please select a new rating."))
 
-        return self._show_success_message(message)
+        job = self._create_job(book_ids=[(6, 0, self.book_ids.ids)])
+        job._trigger_processing()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Mass Operation Job'),
+            'res_model': 'library.mass.operation.job',
+            'res_id': job.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    def _create_job(self, **vals):
+        """Record the operation as a job; small ones are run at once and
+        only recorded (as done) to carry the summary of the operation."""
+        Job = self.env['library.mass.operation.job'].with_context(mail_create_nolog=True)
+        return Job.create(dict({
+            'name': '%s (%s books)' % (dict(self._fields['operation_type'].selection)[self.operation_type],
+                                       len(self.book_ids)),
+            'operation_type': self.operation_type,
+            'new_status': self.new_status,
+            'new_rating': self.new_rating,
+            'chunk_size': BACKGROUND_THRESHOLD,
+            'total_count': len(self.book_ids),
+        }, **vals))
 
     def _show_success_message(self, message):
         """Show success message and close wizard"""
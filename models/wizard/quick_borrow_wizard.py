@@ -1,6 +1,8 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 
+from ..library_perf_stat import instrumented
+
 
 class QuickBorrowWizard(models.TransientModel):
     _name = 'library.quick.borrow.wizard'
@@ -10,6 +12,12 @@ class QuickBorrowWizard(models.TransientModel):
     book_id = fields.Many2one('library.book', string='Book', required=True,
                               domain="[('status', '=', 'available')]")
     due_date = fields.Date(string='Due Date', required=True, default=fields.Date.context_today)
+    book_available = fields.Boolean(string='Book Available', compute='_compute_book_available')
+
+    # Barcode scanning
+    scan_mode = fields.Boolean(string='Scan Mode')
+    member_code = fields.Char(string='Member Card')
+    book_code = fields.Char(string='Book ISBN')
 
     @api.model
     def default_get(self, fields_list):
@@ -27,16 +35,57 @@ class QuickBorrowWizard(models.TransientModel):
 
         return res
 
+    @api.depends('book_id')
+    def _compute_book_available(self):
+        for wizard in self:
+            availability = wizard.book_id._get_availability()
+            wizard.book_available = availability.get(wizard.book_id._origin.id, False)
+
+    @api.model
+    def resolve_scan(self, member_code=None, book_code=None):
+        """Resolve a scanned member card and book ISBN to record ids"""
+        member = self.env['library.member']
+        if member_code:
+            member = member.search([('barcode', '=', member_code.strip())], limit=1)
+        book = self.env['library.book'].find_by_isbn(book_code) if book_code else self.env['library.book']
+        return {'member_id': member.id, 'book_id': book.id}
+
+    @api.onchange('member_code', 'book_code')
+    def _onchange_scan_codes(self):
+        """Fill member and book from the scanned codes"""
+        if not self.member_code and not self.book_code:
+            return
+        resolved = self.resolve_scan(self.member_code, self.book_code)
+        if self.member_code:
+            if not resolved['member_id']:
+                return {
+                    'warning': {
+                        'title': _('Unknown Member'),
+                        'message': _('No member found for card "%s".') % self.member_code
+                    }
+                }
+            self.member_id = resolved['member_id']
+        if self.book_code:
+            if not resolved['book_id']:
+                return {
+                    'warning': {
+                        'title': _('Unknown Book'),
+                        'message': _('No book found for ISBN "%s".') % self.book_code
+                    }
+                }
+            self.book_id = resolved['book_id']
+
     @api.onchange('member_id', 'book_id')
     def _onchange_member_book(self):
         """Check if member can borrow and book is available"""
         if self.member_id and self.book_id:
             # Check if book is still available
-            if self.book_id.status != 'available':
+            if not self.book_id._get_availability().get(self.book_id._origin.id):
                 return {
                     'warning': {
                         'title': _('Book Not Available'),
-                        'message': _('This book is currently not available for borrowing.')
+                        'message': _('This book is currently not available for borrowing. '
+                                     'You can reserve it instead.')
                     }
                 }
 
@@ -54,12 +103,33 @@ class QuickBorrowWizard(models.TransientModel):
                     }
                 }
 
+    def action_reserve(self):
+        """Queue the member for a book that is not available"""
+        self.ensure_one()
+        reservation = self.env['library.reservation'].create({
+            'member_id': self.member_id.id,
+            'book_id': self.book_id.id,
+        })
+        message = _('"%s" is number %s in line for "%s".') % (
+            self.member_id.name, reservation.queue_position, self.book_id.name
+        )
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'message': message,
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            }
+        }
+
+    @instrumented('wizard.quick_borrow')
     def action_confirm_borrow(self):
         """Create borrowing record"""
         self.ensure_one()
 
         # Validate book availability
-        if self.book_id.status != 'available':
+        if not self.book_id._get_availability()[self.book_id.id]:
             raise ValidationError(_('This book is not available for borrowing.'))
 
         # Create borrowing record
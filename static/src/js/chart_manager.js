@@ -24,9 +24,8 @@ var LibraryChartManager = AbstractAction.extend({
         var self = this;
         return rpc.query({
             model: 'library.book',
-            method: 'search_read',
-            domain: [],
-            fields: ['status']
+            method: 'get_chart_data',
+            args: [],
         }).then(function(result) {
             self.books_data = result;
             self._renderChart();
@@ -35,12 +34,8 @@ var LibraryChartManager = AbstractAction.extend({
 
     _renderChart: function() {
         // Implement chart rendering using Chart.js or other library
-        var available = this.books_data.filter(function(book) {
-            return book.status === 'available';
-        }).length;
-        var borrowed = this.books_data.filter(function(book) {
-            return book.status === 'checked_out';
-        }).length;
+        var available = this.books_data.status.available || 0;
+        var borrowed = this.books_data.status.checked_out || 0;
 
         // Chart rendering code here
         console.log('Available:', available, 'Borrowed:', borrowed);
@@ -0,0 +1,146 @@
+from odoo.tests import HttpCase, TransactionCase, tagged
+
+from odoo.addons.Library_Manager.benchmarks.library_benchmark import check_thresholds, make_thresholds
+
+
+class LibraryPerformanceCase(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.member = cls.env['library.member'].create({
+            'name': 'Perf Member',
+            'user_id': cls.env.user.id,
+        })
+        cls.books = cls.env['library.book'].create([{
+            'name': 'Perf Book %s' % index,
+            'author': 'Perf Author',
+            'borrow_price': 5.0,
+        } for index in range(21)])
+
+    def count_queries(self, func):
+        """Number of queries run by ``func`` on a cold ORM cache"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        count = self.cr.sql_log_count
+        func()
+        self.env.flush_all()
+        return self.cr.sql_log_count - count
+
+    def borrow(self, books):
+        wizard = self.env['library.book.borrow.wizard'].create({
+            'member_id': self.member.id,
+            'book_ids': [(6, 0, books.ids)],
+        })
+        return lambda: wizard.action_borrow_books()
+
+    def give_back(self, books):
+        borrowings = self.env['library.borrowing'].search([('book_id', 'in', books.ids), ('returned', '=', False)])
+        wizard = self.env['library.book.return.wizard'].create({
+            'borrowing_ids': [(6, 0, borrowings.ids)],
+        })
+        return lambda: wizard.action_return_books()
+
+
+class TestLibraryQueryCounts(LibraryPerformanceCase):
+    """The hot paths must run a constant number of queries, whatever the
+    number of records they handle."""
+
+    def test_checkout_query_count(self):
+        one = self.count_queries(self.borrow(self.books[:1]))
+        twenty = self.count_queries(self.borrow(self.books[1:]))
+        # A small margin for the expense module, which is not under test here
+        self.assertLessEqual(twenty, one + 2, "Checking out 20 books must cost as many queries as one")
+
+    def test_checkout_nothing(self):
+        Borrowing = self.env['library.borrowing']
+        self.assertEqual(self.count_queries(lambda: self.assertFalse(Borrowing.create([]))), 0)
+
+    def test_return_query_count(self):
+        self.borrow(self.books)()
+        one = self.count_queries(self.give_back(self.books[:1]))
+        twenty = self.count_queries(self.give_back(self.books[1:]))
+        self.assertLessEqual(twenty, one + 2, "Returning 20 books must cost as many queries as one")
+
+    def test_book_tree_query_count(self):
+        Book = self.env['library.book']
+        fields = list(Book.get_views([(False, 'list')])['models'][Book._name])
+        one = self.count_queries(lambda: Book.web_search_read([('id', 'in', self.books[:1].ids)], fields))
+        twenty = self.count_queries(lambda: Book.web_search_read([('id', 'in', self.books[1:].ids)], fields))
+        self.assertEqual(twenty, one)
+
+    def test_member_tree_query_count(self):
+        Member = self.env['library.member']
+        members = self.member | Member.create([{
+            'name': 'Perf Member %s' % index,
+            'user_id': self.env.user.id,
+        } for index in range(19)])
+        self.borrow(self.books[:3])()
+        fields = list(Member.get_views([(False, 'list')])['models'][Member._name])
+        one = self.count_queries(lambda: Member.web_search_read([('id', 'in', self.member.ids)], fields))
+        twenty = self.count_queries(lambda: Member.web_search_read([('id', 'in', members.ids)], fields))
+        self.assertEqual(twenty, one)
+
+    def test_dashboard_query_count(self):
+        Dashboard = self.env['library.dashboard']
+        queries = self.count_queries(lambda: (Dashboard._refresh_materialized_view(), Dashboard.search_read([], [])))
+        self.assertLessEqual(queries, 10)
+
+
+class TestLibraryBenchmarkThresholds(TransactionCase):
+
+    def test_thresholds(self):
+        results = {'checkout_wizard': {'queries': 40, 'time_ms': 100.0}}
+        thresholds = make_thresholds(results)
+        self.assertEqual(thresholds['checkout_wizard'], {'queries': 45, 'time_ms': 150.0})
+        self.assertFalse(check_thresholds(results, thresholds))
+
+        regressed = {'checkout_wizard': {'queries': 46, 'time_ms': 100.0}}
+        self.assertEqual(len(check_thresholds(regressed, thresholds)), 1)
+        self.assertFalse(check_thresholds({}, thresholds), "Scenarios that did not run are not regressions")
+
+
+@tagged('post_install', '-at_install')
+class TestLibraryCatalogPage(HttpCase):
+
+    def test_catalog_page_revalidation(self):
+        self.env['library.book'].create({'name': 'Web Book', 'author': 'Web Author', 'borrow_price': 1.0})
+        response = self.url_open('/library/books')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Web Book', response.text)
+        etag = response.headers.get('ETag')
+        self.assertTrue(etag)
+
+        response = self.url_open('/library/books', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_catalog_page_after_delete(self):
+        books = self.env['library.book'].create([
+            {'name': 'Deleted Book', 'author': 'Web Author', 'borrow_price': 1.0},
+            {'name': 'Kept Book', 'author': 'Web Author', 'borrow_price': 1.0},
+        ])
+        response = self.url_open('/library/books')
+        self.assertIn('Deleted Book', response.text)
+        etag = response.headers.get('ETag')
+
+        # Not the most recently written book: MAX(write_date) does not move
+        books[0].unlink()
+        response = self.url_open('/library/books', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Deleted Book', response.text)
+
+    def test_catalog_page_query_count(self):
+        self.env['library.book'].create([{
+            'name': 'Web Book %s' % index, 'author': 'Web Author', 'borrow_price': 1.0,
+        } for index in range(60)])
+        # Warm the registry and the route map, then compare cold page renders
+        self.url_open('/library/books?limit=1')
+
+        def page_queries(url):
+            count = self.cr.sql_log_count
+            self.url_open(url)
+            return self.cr.sql_log_count - count
+
+        one = page_queries('/library/books?limit=1&status=available')
+        fifty = page_queries('/library/books?limit=50&language=ar')
+        self.assertEqual(fifty, one, "The catalog page must cost the same queries whatever its size")